@@ -0,0 +1,335 @@
+# benchmark.py
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fixture_site import FixtureSite, FixtureConfig
+from link_checker import LinkChecker, DEFAULT_WORKERS
+from host_limiter import HostLimiter
+from static_seo import StaticSeoChecker, SnapshotParser
+from upto_alt import VacationRentalTester
+from image_audit import ImageProber
+from browser_profile import IMAGE_PROFILE
+from currency_check import CurrencySelectionBot
+from scraped_data import read_script_data
+from driver_pool import DriverPool
+
+
+SUITES = ('links', 'static', 'seo', 'currency', 'script_data', 'images')
+BROWSER_SUITES = {'seo', 'currency', 'script_data', 'images'}
+MEMORY_SAMPLE_INTERVAL = 0.05
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def current_rss():
+    # Resident set size of this process in bytes (Linux); None elsewhere
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class MemoryPeak:
+    """
+    Peak memory growth of this process while the block runs. RSS is sampled
+    from a background thread where available (browsers are separate processes
+    and not included); otherwise tracemalloc's Python heap peak is used.
+    """
+    def __enter__(self):
+        self.peak = 0
+        self.baseline = current_rss()
+        self._stop = threading.Event()
+        if self.baseline is None:
+            tracemalloc.start()
+        else:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(MEMORY_SAMPLE_INTERVAL):
+            self.peak = max(self.peak, current_rss() - self.baseline)
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.baseline is None:
+            self.peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        else:
+            self._stop.set()
+            self._thread.join()
+            self.peak = max(self.peak, current_rss() - self.baseline)
+
+
+class SuiteBenchmark:
+    def __init__(self, name, unit):
+        self.name = name
+        self.unit = unit
+        self.latencies = []
+        # Time items spent waiting on the host limiter (rate limit, concurrency, backoff), where measured
+        self.waits = []
+        self.failures = 0
+        self.seconds = 0.0
+        self.peak_memory = 0
+        self.error = None
+        self._lock = threading.Lock()
+
+    def timed(self, func, *args):
+        """
+        Call func(*args) and record how long it took as one item.
+        Items that raise are counted as failures instead.
+        """
+        started = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        self.record(time.perf_counter() - started)
+        return result
+
+    def record(self, seconds, waited=None):
+        with self._lock:
+            self.latencies.append(seconds)
+            if waited is not None:
+                self.waits.append(waited)
+
+    def summary(self):
+        items = len(self.latencies)
+        return {
+            'suite': self.name,
+            'unit': self.unit,
+            'items': items,
+            'failures': self.failures,
+            'seconds': round(self.seconds, 3),
+            'throughput_per_s': round(items / self.seconds, 2) if self.seconds else 0.0,
+            'p50_ms': round(percentile(self.latencies, 0.5) * 1000, 1),
+            'p95_ms': round(percentile(self.latencies, 0.95) * 1000, 1),
+            'wait_p50_ms': round(percentile(self.waits, 0.5) * 1000, 1),
+            'wait_p95_ms': round(percentile(self.waits, 0.95) * 1000, 1),
+            'wait_total_s': round(sum(self.waits), 3),
+            'peak_memory_mb': round(self.peak_memory / 2 ** 20, 1),
+            'error': self.error,
+        }
+
+
+def page_link_entries(session, url):
+    parser = SnapshotParser(url)
+    parser.feed(session.get(url, timeout=10).text)
+    return parser.links
+
+
+class TimedLimiter(HostLimiter):
+    """
+    HostLimiter that keeps, per thread, how long requests waited for a slot
+    (rate limit, concurrency or backoff), so it can be left out of request times.
+    """
+    def __init__(self, concurrency, rate):
+        super().__init__(concurrency, rate)
+        self._waits = threading.local()
+
+    def take_wait(self):
+        waited = getattr(self._waits, 'seconds', 0.0)
+        self._waits.seconds = 0.0
+        return waited
+
+    @contextmanager
+    def slot(self, url):
+        started = time.perf_counter()
+        with super().slot(url):
+            self._waits.seconds = getattr(self._waits, 'seconds', 0.0) + time.perf_counter() - started
+            yield
+
+
+class TimedLinkChecker(LinkChecker):
+    def __init__(self, bench, **kwargs):
+        super().__init__(**kwargs)
+        self.bench = bench
+
+    def verdict(self, href):
+        # Only the requests count, not the time spent queued for the host
+        self.limiter.take_wait()
+        started = time.perf_counter()
+        row = super().verdict(href)
+        waited = self.limiter.take_wait()
+        self.bench.record(time.perf_counter() - started - waited, waited)
+        return row
+
+
+def bench_links(bench, site, args):
+    # Same path as UrlTester: de-duplication, host interleaving and the bounded queue of check_stream()
+    # The fixture is a single host, so it is not throttled unless asked for
+    limiter = TimedLimiter(args.host_concurrency or args.workers, args.host_rate)
+    checker = TimedLinkChecker(bench, max_workers=args.workers, limiter=limiter)
+    try:
+        entries = (entry for url in site.page_urls() for entry in page_link_entries(checker.session, url))
+        checker.check_stream(entries)
+    finally:
+        checker.close()
+
+
+def bench_static(bench, site, args):
+    checker = StaticSeoChecker()
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(lambda url: bench.timed(checker.test_page, url), site.page_urls()))
+    finally:
+        checker.close()
+
+
+def bench_seo(bench, site, args, pool):
+    def test_page(url):
+        tester = VacationRentalTester(url, pool=pool)
+        try:
+            tester.navigate()
+            tester.test_h1_tag()
+            tester.test_html_tag_sequence()
+            tester.test_image_alt_attributes()
+        finally:
+            tester.close()
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        list(executor.map(lambda url: bench.timed(test_page, url), site.page_urls()))
+
+
+def bench_images(bench, site, args, pool):
+    prober = ImageProber()
+
+    def audit(url):
+        tester = VacationRentalTester(url, pool=pool.scoped(IMAGE_PROFILE))
+        try:
+            tester.navigate()
+            tester.test_image_assets(prober)
+        finally:
+            tester.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            list(executor.map(lambda url: bench.timed(audit, url), site.page_urls()))
+    finally:
+        prober.close()
+
+
+class TimedCurrencyBot(CurrencySelectionBot):
+    def __init__(self, url, bench, **kwargs):
+        super().__init__(url, **kwargs)
+        self.bench = bench
+
+    def log(self, message):
+        logging.debug(message)
+
+    def check_currency_option(self, driver, index, option):
+        return self.bench.timed(super().check_currency_option, driver, index, option)
+
+
+def bench_currency(bench, site, args, pool):
+    bot = TimedCurrencyBot(site.page_urls()[0], bench, pool=pool, workers=pool.size)
+    if not bot.run_currency_selection_test():
+        raise RuntimeError("Currency test did not run")
+
+
+def bench_script_data(bench, site, args, pool):
+    def read(url):
+        with pool.session() as driver:
+            driver.get(url)
+            return read_script_data(driver)
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        list(executor.map(lambda url: bench.timed(read, url), site.page_urls()))
+
+
+BENCHMARKS = {
+    'links': (bench_links, 'link'),
+    'static': (bench_static, 'page'),
+    'seo': (bench_seo, 'page'),
+    'currency': (bench_currency, 'currency'),
+    'script_data': (bench_script_data, 'page'),
+    'images': (bench_images, 'page'),
+}
+
+
+def run_benchmarks(args):
+    config = FixtureConfig(pages=args.pages, headings=args.headings, images=args.images, links=args.links,
+                           broken_ratio=args.broken_ratio, misordered_ratio=args.misordered_ratio,
+                           latency=args.latency)
+    results = []
+    pool = DriverPool(size=args.browsers) if BROWSER_SUITES & set(args.suites) else None
+    with FixtureSite(config) as site:
+        try:
+            for name in args.suites:
+                func, unit = BENCHMARKS[name]
+                bench = SuiteBenchmark(name, unit)
+                extra = (pool,) if name in BROWSER_SUITES else ()
+                started = time.perf_counter()
+                try:
+                    with MemoryPeak() as memory:
+                        func(bench, site, args, *extra)
+                except Exception as e:
+                    bench.error = str(e).splitlines()[0] if str(e) else type(e).__name__
+                    logging.error(f"Benchmark {name} failed: {e}")
+                bench.seconds = time.perf_counter() - started
+                bench.peak_memory = memory.peak
+                results.append(bench.summary())
+        finally:
+            if pool:
+                pool.close_all()
+    return results
+
+
+def print_results(results):
+    print(f"{'suite':<12} {'items':>6} {'time s':>8} {'per s':>8} {'p50 ms':>8} {'p95 ms':>8} {'peak MB':>8} "
+          f"{'wait p50':>9} {'wait p95':>9}")
+    for row in results:
+        line = (f"{row['suite']:<12} {row['items']:>6} {row['seconds']:>8.2f} {row['throughput_per_s']:>8.1f} "
+                f"{row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} {row['peak_memory_mb']:>8.1f} "
+                f"{row['wait_p50_ms']:>9.1f} {row['wait_p95_ms']:>9.1f}")
+        print(line + (f"  ❌ {row['error']}" if row['error'] else ""))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the test engines against a local fixture site.")
+    parser.add_argument('--suites', nargs='+', choices=SUITES, default=list(SUITES))
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--headings', type=int, default=12)
+    parser.add_argument('--images', type=int, default=20)
+    parser.add_argument('--links', type=int, default=50, help="Links per page")
+    parser.add_argument('--broken-ratio', type=float, default=0.1, help="Share of links that return 404")
+    parser.add_argument('--misordered-ratio', type=float, default=0.0,
+                        help="Share of pages whose headings fail the sequence check")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="HTTP workers for links/static")
+    parser.add_argument('--host-concurrency', type=int,
+                        help="Link requests in flight to the fixture host (default: --workers)")
+    parser.add_argument('--host-rate', type=float, default=0.0,
+                        help="Link requests started per second on the fixture host; 0 for no limit "
+                             "(default: %(default)s)")
+    parser.add_argument('--browsers', type=int, default=2, help="Browsers for the browser suites")
+    parser.add_argument('--output', help="Also write the results as JSON, for comparing runs")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args)
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump({'config': vars(args), 'results': results}, handle, indent=2)
+        print(f"✅ Benchmark results written to {args.output}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
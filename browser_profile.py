@@ -0,0 +1,105 @@
+# browser_profile.py
+import logging
+from selenium.webdriver.chrome.options import Options
+
+
+WINDOW_SIZE = (1920, 1080)
+
+IMAGE_EXTENSIONS = ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'bmp', 'ico', 'svg')
+MEDIA_EXTENSIONS = ('mp4', 'webm', 'ogg', 'mov', 'm3u8', 'mp3', 'wav', 'm4a')
+FONT_EXTENSIONS = ('woff', 'woff2', 'ttf', 'otf', 'eot')
+ANALYTICS_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googleadservices.com',
+    'googlesyndication.com', 'connect.facebook.net', 'hotjar.com', 'clarity.ms', 'segment.io',
+    'segment.com', 'mixpanel.com', 'newrelic.com', 'nr-data.net', 'bat.bing.com', 'tiktok.com',
+    'criteo.com', 'criteo.net', 'taboola.com', 'outbrain.com',
+)
+
+
+def extension_patterns(extensions):
+    # Chrome matches the whole URL, so also cover URLs with a query string
+    patterns = []
+    for extension in extensions:
+        patterns += [f"*.{extension}", f"*.{extension}?*"]
+    return patterns
+
+
+def domain_patterns(domains):
+    return [f"*://*.{domain}/*" for domain in domains] + [f"*://{domain}/*" for domain in domains]
+
+
+class BrowserProfile:
+    def __init__(self, headless=True, block_images=True, block_media=True, block_fonts=True,
+                 block_analytics=True, blocked_urls=(), window_size=WINDOW_SIZE):
+        """
+        How pooled browsers are launched and what they are allowed to download.
+        Blocking is done with CDP (Network.setBlockedURLs), so <img> elements
+        keep their attributes but the image bytes are never fetched.
+        """
+        self.headless = headless
+        self.block_images = block_images
+        self.block_media = block_media
+        self.block_fonts = block_fonts
+        self.block_analytics = block_analytics
+        self.blocked_urls = tuple(blocked_urls)
+        self.window_size = window_size
+
+    def replace(self, **changes):
+        """
+        A copy of this profile with some settings changed, for per-suite overrides.
+        """
+        settings = dict(vars(self), **changes)
+        return BrowserProfile(**settings)
+
+    def blocked_patterns(self):
+        patterns = []
+        if self.block_images:
+            patterns += extension_patterns(IMAGE_EXTENSIONS)
+        if self.block_media:
+            patterns += extension_patterns(MEDIA_EXTENSIONS)
+        if self.block_fonts:
+            patterns += extension_patterns(FONT_EXTENSIONS)
+        if self.block_analytics:
+            patterns += domain_patterns(ANALYTICS_DOMAINS)
+        return patterns + list(self.blocked_urls)
+
+    def chrome_options(self):
+        """
+        Chrome options for a browser started with this profile.
+        """
+        options = Options()
+        if self.headless:
+            options.add_argument("--headless=new")
+            options.add_argument(f"--window-size={self.window_size[0]},{self.window_size[1]}")
+        else:
+            options.add_argument("--start-maximized")
+        options.add_argument("--disable-extensions")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--mute-audio")
+        return options
+
+    def apply(self, driver):
+        """
+        Install this profile's block list on a running browser. Replaces any
+        previous list, so a browser can switch profiles between suites.
+        """
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.blocked_patterns()})
+        except Exception as e:
+            logging.warning(f"Could not apply the browser profile: {e}")
+
+    def __repr__(self):
+        blocked = [name for name in ('images', 'media', 'fonts', 'analytics') if getattr(self, f"block_{name}")]
+        return f"BrowserProfile(headless={self.headless}, blocked={blocked})"
+
+
+# Headless, no images, media, fonts or trackers: enough for every DOM-level check
+LEAN_PROFILE = BrowserProfile()
+# Lean, but loads images so the image audit can compare natural and displayed sizes
+IMAGE_PROFILE = BrowserProfile(block_images=False)
+# Loads everything, as a visitor's browser would
+FULL_PROFILE = BrowserProfile(block_images=False, block_media=False, block_fonts=False, block_analytics=False)
+DEFAULT_PROFILE = LEAN_PROFILE
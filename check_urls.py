@@ -1,96 +1,123 @@
 # check_urls.py
-import os
-import time
 import logging
-import requests
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-from tqdm import tqdm
+from driver_pool import DriverPool
+from report_sink import write_results
+from waits import wait_for_page_load
+from link_checker import LinkChecker, DEFAULT_TIMEOUT, DEFAULT_WORKERS, DEFAULT_MAX_RETRIES
+from link_cache import LinkStatusCache, DEFAULT_TTL
+from instrumentation import traced
+
+
+# [href, where] for one anchor: the nearest landmark plus the link text
+LINK_ENTRY_FUNCTION = """
+function linkEntry(a) {
+    var landmark = a.closest('header, nav, footer, aside, main, section[id], [id^="js-"]');
+    var where = landmark ? (landmark.id ? '#' + landmark.id : landmark.tagName.toLowerCase()) : 'body';
+    var text = (a.innerText || a.title || '').trim().replace(/\\s+/g, ' ').slice(0, 40);
+    return [a.href, text ? where + ' "' + text + '"' : where];
+}
+"""
+
+# Collect every anchor's href together with where it sits on the page in a single round-trip.
+LINKS_SCRIPT = LINK_ENTRY_FUNCTION + """
+return Array.from(document.querySelectorAll('a[href]'), linkEntry);
+"""
+
+# The same entries, `arguments[1]` at a time from offset `arguments[0]`. The anchor list is
+# captured on the first call, so later chunks are not shifted by re-rendering.
+LINKS_CHUNK_SCRIPT = LINK_ENTRY_FUNCTION + """
+var offset = arguments[0], limit = arguments[1];
+if (offset === 0 || !window.__qaLinks) { window.__qaLinks = document.querySelectorAll('a[href]'); }
+var links = window.__qaLinks, end = Math.min(offset + limit, links.length), chunk = [];
+for (var i = offset; i < end; i++) { chunk.push(linkEntry(links[i])); }
+if (end >= links.length) { delete window.__qaLinks; }
+return chunk;
+"""
+LINK_CHUNK_SIZE = 500
+
+
+def iter_link_entries(driver, chunk_size=LINK_CHUNK_SIZE):
+    """
+    Yield (href, where) for every anchor on the current page, fetched in
+    chunks so a page with tens of thousands of links is never held at once.
+    """
+    offset = 0
+    while True:
+        chunk = driver.execute_script(LINKS_CHUNK_SCRIPT, offset, chunk_size)
+        for href, where in chunk:
+            yield href, where
+        if len(chunk) < chunk_size:
+            return
+        offset += chunk_size
 
 
 class UrlTester:
-    def __init__(self, url):
+    def __init__(self, url, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, strip_tracking=False,
+                 cache=None, force_recheck=False, pool=None, sink=None, limiter=None,
+                 max_retries=DEFAULT_MAX_RETRIES, checkpoint=None, response_cache=None, stop=None):
         """
-        Initialize the tester with Chrome WebDriver
+        Initialize the tester with a WebDriver from `pool` (a private one if none
+        is given); the link-check options are passed on to LinkChecker.
         """
         try:
-            options = Options()
-            options.headless = False  # Set to True if you don't want a browser window
-            self.service = Service(ChromeDriverManager().install())
-            # self.service = Service("C:/Users/Opu/.wdm/drivers/chromedriver/win64/131.0.6778.87/chromedriver.exe")  # Update for your local driver path
-            self.driver = webdriver.Chrome(service=self.service)
+            self.owns_pool = pool is None
+            self.pool = pool or DriverPool()
+            self.driver = self.pool.acquire()
             self.url = url
+            self.max_workers = max_workers
+            self.timeout = timeout
+            self.strip_tracking = strip_tracking
+            self.cache = cache
+            self.force_recheck = force_recheck
+            self.limiter = limiter
+            self.max_retries = max_retries
+            self.checkpoint = checkpoint
+            self.response_cache = response_cache
+            self.stop = stop
+            self.sink = sink
             self.results = []
             logging.info(f"Initialized tester for URL: {url}")
         except Exception as e:
             logging.error(f"Initialization error: {e}")
             raise
 
+    @traced('links.navigate')
     def navigate(self):
         """
         Navigate to the website
         """
         try:
             self.driver.get(self.url)
-            time.sleep(3)  # Wait for page load
+            wait_for_page_load(self.driver)  # Wait for page load
             logging.info(f"Successfully navigated to {self.url}")
         except Exception as e:
             logging.error(f"Navigation error: {e}")
             raise
 
+    @traced('links.check_all_urls')
     def check_all_urls(self):
         """
         Check the status codes of all the links on the webpage and show progress.
         """
         try:
             self.driver.get(self.url)
-            time.sleep(3)  # Wait for page load
-            links = self.driver.find_elements(By.TAG_NAME, 'a')
+            wait_for_page_load(self.driver)  # Wait for page load
+            # Extract, de-duplicate and check the links as a stream, in constant memory
+            checker = LinkChecker(max_workers=self.max_workers, timeout=self.timeout,
+                                  strip_tracking=self.strip_tracking,
+                                  cache=self.cache, force_recheck=self.force_recheck,
+                                  limiter=self.limiter, max_retries=self.max_retries,
+                                  checkpoint=self.checkpoint, response_cache=self.response_cache,
+                                  stop=self.stop)
+            try:
+                self.results.extend(checker.check_stream(iter_link_entries(self.driver)))
+            finally:
+                checker.close()
 
             # Log total number of links found
-            logging.info(f"Found {len(links)} links on the page.")
-            print(f"✅ Found {len(links)} links on the page.")
-
-            # Use tqdm for progress bar
-            for link in tqdm(links, desc="Checking URLs", unit="URL"):
-                href = link.get_attribute('href')
-                if href:  # Only check links that have an href attribute
-                    print(f"⏳ Checking URL: {href}")
-                    logging.info(f"Checking URL: {href}")
-                    # response = requests.get(href)
-                    try:
-                        response = requests.get(href)
-                        if response.status_code == 404:
-                            print(f"❌ 404 Not Found: {href}")
-                            self.results.append({
-                                'page_url': href,
-                                'testcase': 'URL Status Code',
-                                'status': 'Fail',
-                                'comments': '404 Not Found'
-                            })
-                        else:
-                            print(f"✅ URL Status Code: {response.status_code}")
-                            # self.results.append({
-                            #     'page_url': href,
-                            #     'testcase': 'URL Status Code',
-                            #     'status': 'Pass',
-                            #     'comments': f'Status Code: {response.status_code}'
-                            # })
-                    except Exception as e:
-                        print(f"❌ Error checking URL: {href}")
-                        self.results.append({
-                            'page_url': href,
-                            'testcase': 'URL Status Code',
-                            'status': 'Fail',
-                            'comments': f'Error: {str(e)}'
-                        })
-                    time.sleep(1)  # Optional delay for better visibility
+            found, unique = checker.stats['links_found'], checker.stats['unique_links']
+            logging.info(f"Found {found} links on the page, {unique} unique.")
+            print(f"✅ Found {found} links on the page ({unique} unique).")
 
             # Generate Excel report after checking all URLs
             # self.generate_excel_report()
@@ -101,49 +128,11 @@ class UrlTester:
 
     def generate_excel_report(self):
         """
-        Generate an Excel report for test results.
+        Send the URL test results to the Test sheet of the report.
         """
         try:
-            os.makedirs('reports', exist_ok=True)
-            report_file = 'reports/all_the_reports.xlsx'
-            if os.path.exists(report_file):
-                print("Exist...")
-                # workbook = openpyxl.Workbook()
-                # sheet = workbook.active
-                workbook = openpyxl.load_workbook(report_file)
-                if "Test" not in workbook.sheetnames:
-                    sheet = workbook.create_sheet(title="Test")
-                else:
-                    sheet = workbook["Test"]
-            else:
-                workbook = openpyxl.Workbook()
-                sheet = workbook.active
-                sheet.title = "Test"
-            # Define headers
-            if sheet.max_row == 1:
-                headers = ['Page URL', 'Test Case', 'Status', 'Comments']
-                for col, header in enumerate(headers, start=1):
-                    cell = sheet.cell(row=1, column=col)
-                    cell.value = header
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-                    cell.alignment = Alignment(horizontal='center', vertical='center')
-
-            # Write results
-            for row, result in enumerate(self.results, start=5):
-                sheet.cell(row=row, column=1, value=result['page_url'])
-                sheet.cell(row=row, column=2, value=result['testcase'])
-                sheet.cell(row=row, column=3, value=result['status'])
-                sheet.cell(row=row, column=4, value=result['comments'])
-
-            # Adjust column widths
-            for col in range(1, 5):
-                column_letter = get_column_letter(col)
-                sheet.column_dimensions[column_letter].width = 30
-
-            # Save the workbook
-            workbook.save(report_file)
-            print(f"✅ URL Test Results saved to: {report_file}")
+            report_file = write_results('Test', self.results, self.sink, suite='links')
+            print(f"✅ URL Test Results saved to: {report_file or 'shared report'}")
             return report_file
 
         except Exception as e:
@@ -152,27 +141,40 @@ class UrlTester:
 
     def close(self):
         """
-        Close the WebDriver.
+        Return the WebDriver to the pool (and shut it down if the pool is private).
         """
         if self.driver:
-            self.driver.quit()
+            self.pool.release(self.driver)
+            self.driver = None
+        if self.owns_pool:
+            self.pool.close_all()
 
 
-def run_tests_url(url):
+def run_tests_url(url, max_workers=DEFAULT_WORKERS, strip_tracking=False,
+                  use_cache=True, cache_ttl=DEFAULT_TTL, force_recheck=False, pool=None, sink=None,
+                  limiter=None, max_retries=DEFAULT_MAX_RETRIES, checkpoint=None, response_cache=None, stop=None):
     """
-    Run all the tests for the given URL.
+    Run all the tests for the given URL. Returns False if the run was cut short.
     """
     tester = None
+    cache = LinkStatusCache(ttl=cache_ttl) if use_cache else None
     try:
-        tester = UrlTester(url)
+        tester = UrlTester(url, max_workers=max_workers, strip_tracking=strip_tracking,
+                           cache=cache, force_recheck=force_recheck, pool=pool, sink=sink,
+                           limiter=limiter, max_retries=max_retries, checkpoint=checkpoint,
+                           response_cache=response_cache, stop=stop)
         tester.navigate()
         tester.check_all_urls()  # Check all URLs and generate the report
         tester.generate_excel_report()
     except Exception as e:
         print(f"Test execution error: {e}")
-    # finally:
-    #     if tester:
-    #         tester.close()
+        return False
+    finally:
+        if cache:
+            cache.close()
+        if tester:
+            tester.close()
+    return True
 
 
 # Entry point for running tests
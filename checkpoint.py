@@ -0,0 +1,86 @@
+# checkpoint.py
+import os
+import json
+import logging
+import threading
+from collections import Counter
+
+
+CHECKPOINT_DIR = '.cache/checkpoints'
+
+
+def is_error_row(row):
+    # Rows for items that raised rather than produced a verdict; they are retried on resume
+    return bool(row) and str(row.get('comments', '')).startswith('Error:')
+
+
+class Checkpoint:
+    def __init__(self, job, resume=False, directory=CHECKPOINT_DIR):
+        """
+        Append-only JSONL journal of finished work items (links checked, pages
+        tested, currencies verified) and their result rows, for the job `job`.
+        With `resume`, items already in the journal are skipped and their rows
+        replayed; otherwise the journal starts empty.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{job}.jsonl")
+        self._done = {}
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    def _load(self):
+        try:
+            with open(self.path, encoding='utf-8') as journal:
+                for line in journal:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A line cut short by the crash we are resuming from
+                        continue
+                    self._done[(entry['kind'], entry['key'])] = entry['rows']
+        except FileNotFoundError:
+            return
+        if self._done:
+            kinds = Counter(kind for kind, _ in self._done)
+            summary = ', '.join(f"{count} {kind}(s)" for kind, count in sorted(kinds.items()))
+            logging.info(f"Resuming from {self.path}: {summary}")
+            print(f"↩️ Resuming: {summary} already done")
+
+    def done(self, kind, key):
+        return (kind, key) in self._done
+
+    def rows(self, kind, key):
+        """
+        Result rows recorded for a finished item (an empty list if it passed).
+        """
+        return self._done.get((kind, key), [])
+
+    def record(self, kind, key, rows):
+        """
+        Mark an item as finished with its result rows. Items whose rows are
+        errors are not recorded, so a resumed run tries them again.
+        """
+        rows = [row for row in rows if row]
+        if any(is_error_row(row) for row in rows):
+            return
+        line = json.dumps({'kind': kind, 'key': key, 'rows': rows}, default=str)
+        with self._lock:
+            self._done[(kind, key)] = rows
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def finish(self):
+        """
+        The job completed: drop the journal so the next run starts fresh.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        logging.info(f"Checkpoint {self.path} cleared")
@@ -0,0 +1,273 @@
+# crawler.py
+import re
+import time
+import logging
+import threading
+from collections import deque
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+from xml.etree import ElementTree
+from concurrent.futures import ThreadPoolExecutor
+from tqdm import tqdm
+from driver_pool import DriverPool
+from link_checker import build_session, normalize_url, collect_links, LinkChecker, DEFAULT_TIMEOUT
+from link_cache import LinkStatusCache, DEFAULT_TTL
+from upto_alt import VacationRentalTester
+from report_sink import ReportSink
+from check_urls import iter_link_entries
+from static_seo import StaticSeoChecker
+from instrumentation import traced
+
+
+# e.g. https://www.alojamiento.io/property/cabrils/BC-1178728
+PROPERTY_PATH_RE = re.compile(r'^/property/[^/]+/[^/]+/?$')
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 100
+DEFAULT_CRAWL_WORKERS = 4
+ENGINES = ('selenium', 'static')
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+class LinkExtractor(HTMLParser):
+    """
+    Collect the href of every <a> tag in an HTML document.
+    """
+    def __init__(self):
+        super().__init__()
+        self.hrefs = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'a':
+            href = dict(attrs).get('href')
+            if href:
+                self.hrefs.append(href)
+
+
+def is_property_page(url, pattern=PROPERTY_PATH_RE):
+    return bool(pattern.match(urlsplit(url).path))
+
+
+def discover_from_sitemap(sitemap_url, max_pages=DEFAULT_MAX_PAGES, session=None, pattern=PROPERTY_PATH_RE):
+    """
+    Read property page URLs from a sitemap (following nested sitemap indexes).
+    """
+    session = session or build_session()
+    pages, seen = [], set()
+    queue = deque([sitemap_url])
+    while queue and len(pages) < max_pages:
+        current = queue.popleft()
+        try:
+            response = session.get(current, timeout=DEFAULT_TIMEOUT)
+            response.raise_for_status()
+            root = ElementTree.fromstring(response.content)
+        except Exception as e:
+            logging.warning(f"Could not read sitemap {current}: {e}")
+            continue
+        is_index = root.tag == f'{SITEMAP_NS}sitemapindex'
+        for loc in root.iter(f'{SITEMAP_NS}loc'):
+            url = normalize_url((loc.text or '').strip())
+            if not url or url in seen:
+                continue
+            seen.add(url)
+            if is_index:
+                queue.append(url)
+            elif is_property_page(url, pattern):
+                pages.append(url)
+                if len(pages) >= max_pages:
+                    break
+    return pages
+
+
+def discover_from_seed(seed_url, max_depth=DEFAULT_MAX_DEPTH, max_pages=DEFAULT_MAX_PAGES,
+                       session=None, pattern=PROPERTY_PATH_RE):
+    """
+    Breadth-first crawl of same-host pages starting at `seed_url`, collecting
+    property pages up to `max_depth` link hops and `max_pages` results.
+    """
+    session = session or build_session()
+    seed_url = normalize_url(seed_url)
+    host = urlsplit(seed_url).netloc
+    pages, seen = [], {seed_url}
+    queue = deque([(seed_url, 0)])
+    if is_property_page(seed_url, pattern):
+        pages.append(seed_url)
+    while queue and len(pages) < max_pages:
+        current, depth = queue.popleft()
+        if depth >= max_depth:
+            continue
+        try:
+            response = session.get(current, timeout=DEFAULT_TIMEOUT)
+            if 'html' not in response.headers.get('Content-Type', ''):
+                continue
+            extractor = LinkExtractor()
+            extractor.feed(response.text)
+        except Exception as e:
+            logging.warning(f"Could not crawl {current}: {e}")
+            continue
+        for href in extractor.hrefs:
+            url = normalize_url(urljoin(current, href))
+            if not url or url in seen or urlsplit(url).netloc != host:
+                continue
+            seen.add(url)
+            queue.append((url, depth + 1))
+            if is_property_page(url, pattern):
+                pages.append(url)
+                if len(pages) >= max_pages:
+                    break
+    logging.info(f"Discovered {len(pages)} property pages from {seed_url}")
+    return pages
+
+
+class CrawlRunner:
+    def __init__(self, workers=DEFAULT_CRAWL_WORKERS, pool=None, check_links=False, link_cache=None,
+                 engine='selenium', limiter=None, checkpoint=None, response_cache=None, force_recheck=False):
+        """
+        Run the VacationRentalTester checks over many pages with `workers`
+        browsers in parallel. With `check_links`, each page's links are also
+        checked; `link_cache` lets pages share statuses of links they have in common
+        (`force_recheck` ignores its entries).
+        The 'static' engine checks plain HTML and only opens a browser for
+        pages that need JavaScript. `limiter` (a HostLimiter) caps the link
+        requests per host across all pages. With a `checkpoint`, pages tested
+        by an earlier, interrupted run are not tested again.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.workers = max(1, int(workers))
+        self.owns_pool = pool is None
+        self.pool = pool or DriverPool(size=self.workers)
+        self.engine = engine
+        self._static = StaticSeoChecker(session=build_session(self.workers, response_cache), pool=self.pool) \
+            if engine == 'static' else None
+        self.check_links = check_links
+        self.link_cache = link_cache
+        self.force_recheck = force_recheck
+        self.limiter = limiter
+        self.checkpoint = checkpoint
+        self.response_cache = response_cache
+        self._checker = None
+        self._lock = threading.Lock()
+
+    def _link_checker(self):
+        with self._lock:
+            if self._checker is None:
+                self._checker = LinkChecker(cache=self.link_cache, force_recheck=self.force_recheck,
+                                            limiter=self.limiter, response_cache=self.response_cache)
+            return self._checker
+
+    @traced('crawl.page')
+    def test_page(self, url):
+        """
+        Run all checks for one page and return its result rows.
+        """
+        if self._static:
+            return self.test_static_page(url)
+        tester = None
+        try:
+            tester = VacationRentalTester(url, pool=self.pool)
+            tester.navigate()
+            tester.test_h1_tag()
+            tester.test_html_tag_sequence()
+            tester.test_image_alt_attributes()
+            if self.check_links:
+                tester.results.extend(self._link_checker().check_stream(iter_link_entries(tester.driver)))
+            return tester.results
+        except Exception as e:
+            logging.error(f"Crawl error on {url}: {e}")
+            return [{
+                'page_url': url,
+                'testcase': 'Page Load',
+                'status': 'Fail',
+                'comments': f'Error: {str(e)}'
+            }]
+        finally:
+            if tester:
+                tester.close()
+
+    @traced('crawl.static_page')
+    def test_static_page(self, url):
+        try:
+            results, links = self._static.test_page(url)
+            if self.check_links:
+                results.extend(self._link_checker().check_all(collect_links(links)))
+            return results
+        except Exception as e:
+            logging.error(f"Crawl error on {url}: {e}")
+            return [{
+                'page_url': url,
+                'testcase': 'Page Load',
+                'status': 'Fail',
+                'comments': f'Error: {str(e)}'
+            }]
+
+    def run(self, urls, sink):
+        """
+        Test every URL and stream each page's result rows into `sink` as soon
+        as it is done (in input order). Returns the number of rows written.
+        """
+        urls = list(urls)
+        started = time.time()
+        row_count = 0
+        if self.checkpoint:
+            for url in urls:
+                if self.checkpoint.done('page', url):
+                    restored = self.checkpoint.rows('page', url)
+                    sink.add_rows('Test', restored, suite='crawl')
+                    row_count += len(restored)
+            urls = [url for url in urls if not self.checkpoint.done('page', url)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for url, page_results in tqdm(zip(urls, executor.map(self.test_page, urls)), total=len(urls),
+                                          desc="Crawling pages", unit="page"):
+                sink.add_rows('Test', page_results, suite='crawl')
+                row_count += len(page_results)
+                if self.checkpoint:
+                    self.checkpoint.record('page', url, page_results)
+        elapsed = time.time() - started
+        if urls:
+            rate = len(urls) / elapsed * 60 if elapsed else 0
+            print(f"✅ Tested {len(urls)} pages in {elapsed:.1f}s ({rate:.1f} pages/min, {self.workers} workers)")
+        return row_count
+
+    def close(self):
+        if self._checker:
+            self._checker.close()
+        if self._static:
+            self._static.close()
+        if self.owns_pool:
+            self.pool.close_all()
+
+
+def run_crawl(seed_url=None, sitemap_url=None, max_depth=DEFAULT_MAX_DEPTH, max_pages=DEFAULT_MAX_PAGES,
+              workers=DEFAULT_CRAWL_WORKERS, check_links=False, pool=None, engine='selenium', sink=None,
+              limiter=None, checkpoint=None, response_cache=None, use_cache=True, cache_ttl=DEFAULT_TTL,
+              force_recheck=False):
+    """
+    Discover property pages from a seed URL or sitemap, test them in parallel
+    and stream the results into the report (`sink`, or a sink of its own).
+    With `check_links`, `use_cache`, `cache_ttl` and `force_recheck` apply to
+    the link status cache as in check_urls.run_tests_url().
+    """
+    session = build_session(response_cache=response_cache)
+    try:
+        if sitemap_url:
+            urls = discover_from_sitemap(sitemap_url, max_pages=max_pages, session=session)
+        else:
+            urls = discover_from_seed(seed_url, max_depth=max_depth, max_pages=max_pages, session=session)
+    finally:
+        session.close()
+    print(f"✅ Found {len(urls)} property pages to test")
+
+    cache = LinkStatusCache(ttl=cache_ttl) if check_links and use_cache else None
+    runner = CrawlRunner(workers=workers, pool=pool, check_links=check_links, link_cache=cache,
+                         engine=engine, limiter=limiter, checkpoint=checkpoint, response_cache=response_cache,
+                         force_recheck=force_recheck)
+    owns_sink = sink is None
+    sink = sink or ReportSink(keep_existing=True)
+    try:
+        return runner.run(urls, sink)
+    finally:
+        runner.close()
+        if cache:
+            cache.close()
+        if owns_sink:
+            sink.close()
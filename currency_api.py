@@ -0,0 +1,281 @@
+# currency_api.py
+import re
+import json
+import logging
+from statistics import median
+from concurrent.futures import ThreadPoolExecutor
+from link_checker import build_session, CheckStopped, DEFAULT_TIMEOUT
+from currency_check import CurrencySelectionBot
+from waits import wait_for_network_idle
+
+
+DEFAULT_TOLERANCE = 0.02  # 2% spread allowed between implied exchange rates
+DEFAULT_REPLAY_WORKERS = 8
+CURRENCY_MARKER = '__QA_CURRENCY__'
+
+# Records every fetch/XHR the page makes from now on into window.__qaRequests
+RECORDER_SCRIPT = """
+if (!window.__qaRequests) {
+    var log = window.__qaRequests = [];
+    var absolute = function (url) { return new URL(url, location.href).href; };
+    var originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function (input, init) {
+            var headers = {};
+            if (init && init.headers) {
+                new Headers(init.headers).forEach(function (value, key) { headers[key] = value; });
+            }
+            log.push({
+                method: ((init && init.method) || (input && input.method) || 'GET').toUpperCase(),
+                url: absolute(typeof input === 'string' ? input : input.url),
+                body: init && typeof init.body === 'string' ? init.body : null,
+                headers: headers
+            });
+            return originalFetch.apply(this, arguments);
+        };
+    }
+    var originalOpen = XMLHttpRequest.prototype.open;
+    var originalSetHeader = XMLHttpRequest.prototype.setRequestHeader;
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        this.__qaRequest = {method: String(method).toUpperCase(), url: absolute(url), body: null, headers: {}};
+        return originalOpen.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.setRequestHeader = function (key, value) {
+        if (this.__qaRequest) { this.__qaRequest.headers[key] = value; }
+        return originalSetHeader.apply(this, arguments);
+    };
+    XMLHttpRequest.prototype.send = function (body) {
+        if (this.__qaRequest) {
+            this.__qaRequest.body = typeof body === 'string' ? body : null;
+            log.push(this.__qaRequest);
+        }
+        return originalSend.apply(this, arguments);
+    };
+}
+return true;
+"""
+
+# Words of a JSON key (camelCase, snake_case or kebab-case)
+KEY_WORD_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+')
+# A key about a price that ends in one of these (priceId, priceCount) is not an amount
+NON_PRICE_WORDS = {'id', 'ids', 'count', 'code', 'type', 'key', 'index', 'rank', 'level', 'category',
+                   'currency', 'unit', 'version', 'precision', 'decimals', 'format', 'mode'}
+PRICE_HTML_RE = re.compile(r'class="[^"]*\bjs-price-value\b[^"]*"[^>]*>([^<]*)<', re.IGNORECASE)
+AMOUNT_RE = re.compile(r'\d[\d.,\s]*')
+
+
+def currency_code(option_text):
+    match = re.search(r'\((.*?)\)', option_text or '')
+    return match.group(1).strip() if match else None
+
+
+def parse_amount(text):
+    """
+    Parse a displayed price such as "1.234,50" or "1,234.50" into a float.
+    """
+    match = AMOUNT_RE.search(str(text))
+    if not match:
+        return None
+    digits = re.sub(r'\s', '', match.group(0)).rstrip('.,')
+    last_dot, last_comma = digits.rfind('.'), digits.rfind(',')
+    decimal = max(last_dot, last_comma)
+    # A single separator followed by exactly three digits is a thousands separator
+    if decimal >= 0 and (last_dot < 0 or last_comma < 0) and len(digits) - decimal - 1 == 3:
+        decimal = -1
+    if decimal >= 0:
+        whole = re.sub(r'[.,]', '', digits[:decimal])
+        return float(f"{whole}.{digits[decimal + 1:]}")
+    return float(re.sub(r'[.,]', '', digits))
+
+
+def is_price_key(key):
+    """
+    True for JSON keys that hold a price: "price" is one of the key's words
+    (price, totalPrice, nightly_price) and the last word does not make it an
+    id or a count (priceId, priceCount).
+    """
+    words = [word.lower() for word in KEY_WORD_RE.findall(key or '')]
+    return bool({'price', 'prices'} & set(words)) and words[-1] not in NON_PRICE_WORDS
+
+
+def extract_prices(content):
+    """
+    Pull the prices out of a pricing response, in document order: every
+    numeric value under a price key (see is_price_key) for JSON, or every
+    js-price-value element for an HTML fragment.
+    """
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return [amount for amount in map(parse_amount, PRICE_HTML_RE.findall(content)) if amount is not None]
+
+    prices = []
+
+    def walk(node, key=''):
+        if isinstance(node, dict):
+            for child_key, value in node.items():
+                walk(value, child_key)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value, key)
+        elif is_price_key(key) and not isinstance(node, bool):
+            amount = node if isinstance(node, (int, float)) else parse_amount(node)
+            if amount is not None:
+                prices.append(float(amount))
+
+    walk(data)
+    return prices
+
+
+def find_request_template(records, code):
+    """
+    Pick the most recent recorded request that mentions `code` and turn it
+    into a template with the currency replaced by a marker.
+    """
+    pattern = re.compile(rf'(?<![A-Za-z]){re.escape(code)}(?![A-Za-z])', re.IGNORECASE)
+    for record in reversed(records):
+        fields = [record.get('url') or '', record.get('body') or '']
+        match = next((m for m in map(pattern.search, fields) if m), None)
+        if match is None:
+            continue
+        return {
+            'method': record.get('method', 'GET'),
+            'url': pattern.sub(CURRENCY_MARKER, fields[0]),
+            'body': pattern.sub(CURRENCY_MARKER, fields[1]) if record.get('body') else None,
+            'headers': record.get('headers') or {},
+            'lowercase': match.group(0).islower(),
+        }
+    return None
+
+
+class CurrencyApiVerifier(CurrencySelectionBot):
+    def __init__(self, url, log_callback=None, pool=None, tolerance=DEFAULT_TOLERANCE,
+                 replay_workers=DEFAULT_REPLAY_WORKERS, sink=None, stop=None):
+        """
+        Verify currency conversion by replaying the page's own pricing request
+        for every currency over HTTP, instead of clicking each option.
+        Converted prices must imply the same exchange rate within `tolerance`.
+        No more requests are replayed once the `stop` event is set.
+        """
+        super().__init__(url, log_callback=log_callback, pool=pool, sink=sink)
+        self.tolerance = tolerance
+        self.replay_workers = max(1, int(replay_workers))
+        self.session = build_session(self.replay_workers)
+        self.stop = stop
+
+    def capture_pricing_request(self, options, codes):
+        """
+        Click one currency in the browser and capture the request it triggers.
+        Returns (template, code); template is None if no request mentions the currency.
+        """
+        self.driver.execute_script(RECORDER_SCRIPT)
+        start_url = self.driver.current_url
+        index = 1 if len(options) > 1 else 0
+        code = codes[index]
+        self.driver.execute_script("arguments[0].click();", options[index])
+        wait_for_network_idle(self.driver)
+
+        records = self.driver.execute_script("return window.__qaRequests || [];") or []
+        # Sites that switch currency with a full page load show it in the URL instead
+        if self.driver.current_url != start_url:
+            records.append({'method': 'GET', 'url': self.driver.current_url, 'body': None, 'headers': {}})
+        logging.info(f"Captured {len(records)} requests after selecting {code}")
+        return find_request_template(records, code), code
+
+    def copy_browser_state(self):
+        # Replay with the browser's cookies and user agent so the server sees the same visitor
+        for cookie in self.driver.get_cookies():
+            self.session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'),
+                                     path=cookie.get('path', '/'))
+        self.session.headers['User-Agent'] = self.driver.execute_script("return navigator.userAgent;")
+
+    def replay(self, template, code):
+        """
+        Send the pricing request for one currency and return its prices.
+        """
+        if self.stop is not None and self.stop.is_set():
+            raise CheckStopped("Currency replay stopped")
+        value = code.lower() if template['lowercase'] else code
+        headers = {k: v for k, v in template['headers'].items() if k.lower() not in ('cookie', 'content-length')}
+        body = template['body'].replace(CURRENCY_MARKER, value) if template['body'] else None
+        response = self.session.request(template['method'], template['url'].replace(CURRENCY_MARKER, value),
+                                        data=body, headers=headers, timeout=DEFAULT_TIMEOUT)
+        response.raise_for_status()
+        return extract_prices(response.text)
+
+    def evaluate(self, base_code, base_prices, code, prices):
+        """
+        Build the result row for one currency from its prices and the base prices.
+        """
+        row = {'url': self.url, 'currency': code}
+        if not prices:
+            return dict(row, status='Fail', comments="No prices returned")
+        if len(prices) != len(base_prices):
+            return dict(row, status='Fail',
+                        comments=f"Returned {len(prices)} prices, expected {len(base_prices)}")
+        ratios = [price / base for price, base in zip(prices, base_prices) if base > 0]
+        if not ratios:
+            return dict(row, status='Fail', comments=f"No usable {base_code} prices to compare against")
+        rate = median(ratios)
+        if rate <= 0:
+            return dict(row, status='Fail', comments="Prices converted to zero")
+        spread = max(abs(ratio / rate - 1) for ratio in ratios)
+        if code != base_code and all(price == base for price, base in zip(prices, base_prices)):
+            return dict(row, status='Fail', comments=f"Prices identical to {base_code}, not converted")
+        if spread > self.tolerance:
+            return dict(row, status='Fail',
+                        comments=f"Inconsistent conversion: rates vs {base_code} differ by up to {spread:.1%}")
+        return dict(row, status='Pass',
+                    comments=f"Converted consistently (1 {base_code} = {rate:.4f} {code}, spread {spread:.2%})")
+
+    def run_currency_api_test(self):
+        try:
+            self.setup_driver()
+            self.log("🌐 Navigating to website...")
+            options = self.load_currency_options(self.driver)
+            codes = [currency_code(option.get_attribute('innerText')) for option in options]
+            if not options or not all(codes):
+                self.log("❌ Could not read the currency list")
+                return False
+            self.log(f"💰 Found {len(codes)} currency options")
+
+            template, captured_code = self.capture_pricing_request(options, codes)
+            if template is None:
+                self.log("❌ No pricing request found after changing currency; use the UI mode instead")
+                return False
+            self.log(f"📡 Captured pricing request for {captured_code}, replaying it for every currency")
+            self.copy_browser_state()
+            self.release_driver()
+
+            def fetch(code):
+                try:
+                    return code, self.replay(template, code), None
+                except CheckStopped:
+                    raise
+                except Exception as e:
+                    return code, [], e
+
+            with ThreadPoolExecutor(max_workers=self.replay_workers) as executor:
+                responses = list(executor.map(fetch, codes))
+
+            base_code, base_prices, base_error = responses[0]
+            if base_error or not base_prices:
+                self.log(f"❌ Base currency {base_code} returned no prices: {base_error}")
+                return False
+            for code, prices, error in responses:
+                if error:
+                    self.results.append({'url': self.url, 'currency': code, 'status': 'Fail',
+                                         'comments': f"Error: {error}"})
+                else:
+                    self.results.append(self.evaluate(base_code, base_prices, code, prices))
+                self.log(f"{'🟢' if self.results[-1]['status'] == 'Pass' else '❌'} {code}: {self.results[-1]['comments']}")
+        except Exception as e:
+            self.log(f"❌ Critical Test Error: {e}")
+            return False
+        finally:
+            self.release_driver()
+            self.session.close()
+            if self.owns_pool:
+                self.pool.close_all()
+        return True
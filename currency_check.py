@@ -1,31 +1,38 @@
 # currency_check.py
-import time
-import os
 import re
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.chrome.options import Options
 from tqdm import tqdm
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
+from driver_pool import DriverPool
+from report_sink import write_results
+from waits import wait_for_page_load, wait_for_text_change
+from instrumentation import traced
+
+
+PRICE_LOCATOR = (By.CLASS_NAME, 'js-price-value')
+PRICE_UPDATE_TIMEOUT = 10
+
+
+def strip_currency_prefix(price_text):
+    # Compare only the amount, without the 3-character currency prefix
+    return re.sub(r'^.{3}', '', price_text)
+
 
 class CurrencySelectionBot:
-    def __init__(self, url, log_callback=None):
-        self.chrome_options = Options()
-        self.chrome_options.add_argument("--start-maximized")
-        self.chrome_options.add_argument("--disable-extensions")
-        self.chrome_options.add_argument("--disable-gpu")
-        self.chrome_options.add_argument("--no-sandbox")
-        # self.service = Service("C:/Users/Opu/.wdm/drivers/chromedriver/win64/131.0.6778.87/chromedriver.exe")  # Update for your local driver path
-        self.service = Service(ChromeDriverManager().install())
+    def __init__(self, url, log_callback=None, pool=None, workers=1, sink=None, checkpoint=None):
+        # Browsers come from `pool`; a private pool with one browser per worker is used when none is given.
+        # With workers > 1 the currency list is split across that many browsers checked in parallel.
+        # With a `checkpoint`, currencies verified by an interrupted run are not checked again.
+        self.workers = max(1, int(workers))
+        self.owns_pool = pool is None
+        self.pool = pool or DriverPool(size=self.workers)
         self.driver = None
         self.url = url
         self.log_callback = log_callback
+        self.sink = sink
+        self.checkpoint = checkpoint
         self.results = []
 
     def log(self, message):
@@ -34,129 +41,164 @@ class CurrencySelectionBot:
             self.log_callback(message)
 
     def setup_driver(self):
-        self.driver = webdriver.Chrome(service=self.service, options=self.chrome_options)
+        self.driver = self.pool.acquire()
         self.wait = WebDriverWait(self.driver, 30)
 
+    def release_driver(self):
+        if self.driver:
+            self.pool.release(self.driver)
+            self.driver = None
+
+    @traced('currency.load_options')
+    def load_currency_options(self, driver):
+        """
+        Open the property page in `driver` and return the currency <li> options.
+        """
+        driver.get(self.url)
+        wait_for_page_load(driver)
+        currency_dropdown = WebDriverWait(driver, 30).until(
+            EC.presence_of_element_located((By.ID, 'js-currency-sort-footer'))
+        )
+        return currency_dropdown.find_elements(By.XPATH, './/ul[@class="select-ul"]/li')
+
+    @traced('currency.option')
+    def check_currency_option(self, driver, index, option):
+        """
+        Select one currency option and return its result row.
+        """
+        try:
+            # Extract the currency name
+            currency_raw_text = option.get_attribute('innerText')
+            # print(currency_raw_text)
+            currency_match = re.search(r'\((.*?)\)', currency_raw_text)
+            currency_text = currency_match.group(1)
+            self.log(f"\n🔄 Processing Currency Option {index}: {currency_text}")
+
+            # Capture initial prices
+            property_prices = driver.find_elements(*PRICE_LOCATOR)
+            initial_prices = [
+                strip_currency_prefix(price.text.strip()) for price in property_prices
+            ]
+            # initial_text = currency_text
+            driver.execute_script("arguments[0].click();", option)
+
+            # Wait for prices to update, then capture them
+            updated_prices = wait_for_text_change(driver, PRICE_LOCATOR, initial_prices,
+                                                  timeout=PRICE_UPDATE_TIMEOUT,
+                                                  transform=strip_currency_prefix)
+
+            # Compare initial and updated prices
+            status = 'Pass'
+            for initial, updated in zip(initial_prices, updated_prices):
+                if initial != updated:
+                    print(f"Initial : {initial:<10} --- Updated : {updated:<10}")
+                else:
+                    status = 'Fail'  # Mark as fail if any price does not change
+
+            if status == 'Pass':
+                comments = f"Prices updated successfully in {currency_text}"
+                self.log(f"🟢 Property prices successfully updated in {currency_text} ")
+            else:
+                comments = "Prices did not update"
+                self.log(f"❌ Prices did not update for {currency_text}")
+
+            return {
+                'url': self.url,
+                'currency': currency_text,
+                'status': status,
+                'comments': comments
+            }
+
+        except Exception as e:
+            self.log(f"❌ Error with currency option {index}: {e}")
+            return {
+                'url': self.url,
+                'currency': "Unknown",
+                'status': 'Fail',
+                'comments': f"Error: {e}"
+            }
+
+    def checkpoint_key(self, index):
+        return f"{self.url}#{index}"
+
+    def record(self, index, result):
+        if self.checkpoint:
+            self.checkpoint.record('currency', self.checkpoint_key(index), [result])
+
+    def check_currency_share(self, indexes, progress):
+        """
+        Worker for parallel mode: load the page in its own browser and check the
+        currency options at `indexes` (1-based). Returns [(index, result), ...].
+        """
+        checked = []
+        with self.pool.session() as driver:
+            try:
+                options = self.load_currency_options(driver)
+            except Exception as e:
+                self.log(f"❌ Worker could not load currencies: {e}")
+                options = []
+            for index in indexes:
+                if index <= len(options):
+                    result = self.check_currency_option(driver, index, options[index - 1])
+                else:
+                    result = {
+                        'url': self.url,
+                        'currency': "Unknown",
+                        'status': 'Fail',
+                        'comments': f"Error: currency option {index} not found"
+                    }
+                self.record(index, result)
+                checked.append((index, result))
+                progress.update(1)
+        return checked
+
     def run_currency_selection_test(self):
         try:
             self.setup_driver()
             self.log("🌐 Navigating to website...")
-            self.driver.get(self.url)
-
             self.log("🔍 Searching for currency dropdown...")
-            currency_dropdown = self.wait.until(
-                EC.presence_of_element_located((By.ID, 'js-currency-sort-footer'))
-            )
+            currency_options = self.load_currency_options(self.driver)
             self.log("✅ Currency dropdown found!")
-
-            currency_options = currency_dropdown.find_elements(
-                By.XPATH, './/ul[@class="select-ul"]/li'
-            )
             self.log(f"💰 Found {len(currency_options)} currency options")
 
-            for index, option in tqdm(enumerate(currency_options, 1),
-                                      total=len(currency_options),
-                                      desc="Processing currencies",
-                                      ncols=100, unit="option"):
-                try:
-                    # Extract the currency name
-                    currency_raw_text = option.get_attribute('innerText')
-                    # print(currency_raw_text)
-                    currency_match = re.search(r'\((.*?)\)', currency_raw_text)
-                    currency_text = currency_match.group(1)
-                    self.log(f"\n🔄 Processing Currency Option {index}: {currency_text}")
-                    
-                    # Capture initial prices
-                    property_prices = self.driver.find_elements(By.CLASS_NAME, 'js-price-value')
-                    initial_prices = [
-                        re.sub(r'^.{3}', '', price.text.strip()) for price in property_prices
-                    ]
-                    # initial_text = currency_text
-                    self.driver.execute_script("arguments[0].click();", option)
-                    time.sleep(3)  # Wait for prices to update
-
-                    # Capture updated prices
-                    updated_prices = [
-                        re.sub(r'^.{3}', '', price.text.strip()) for price in property_prices
-                    ]
-
-                    # Compare initial and updated prices
-                    price_changes = []
-                    status = 'Pass'
-                    for initial, updated in zip(initial_prices, updated_prices):
-                        if initial != updated:
-                            print(f"Initial : {initial:<10} --- Updated : {updated:<10}")
-                            # price_changes.append(f"{initial} ➡ {updated}")
-                        else:
-                            status = 'Fail'  # Mark as fail if any price does not change
-
-                    if status == 'Pass':
-                        comments = f"Prices updated successfully in {currency_text}"
-                        self.log(f"🟢 Property prices successfully updated in {currency_text} ")
-                    else:
-                        comments = "Prices did not update"
-                        self.log(f"❌ Prices did not update for {currency_text}")
-                    
-                    self.results.append({
-                        'url': self.url,
-                        'currency': currency_text,
-                        'status': status,
-                        'comments': comments
-                    })
-
-                except Exception as e:
-                    self.log(f"❌ Error with currency option {index}: {e}")
-                    self.results.append({
-                        'url': self.url,
-                        'currency': "Unknown",
-                        'status': 'Fail',
-                        'comments': f"Error: {e}"
-                    })
+            # Currencies finished by an interrupted run keep their results
+            checked = [(index, self.checkpoint.rows('currency', self.checkpoint_key(index))[0])
+                       for index in range(1, len(currency_options) + 1)
+                       if self.checkpoint and self.checkpoint.done('currency', self.checkpoint_key(index))]
+            done = {index for index, _ in checked}
+            indexes = [index for index in range(1, len(currency_options) + 1) if index not in done]
+
+            workers = min(self.workers, len(indexes))
+            if workers <= 1:
+                for index in tqdm(indexes, desc="Processing currencies", ncols=100, unit="option"):
+                    result = self.check_currency_option(self.driver, index, currency_options[index - 1])
+                    self.record(index, result)
+                    checked.append((index, result))
+            else:
+                # Hand the listing browser back so the workers can use it too
+                self.release_driver()
+                shares = [indexes[i::workers] for i in range(workers)]
+                self.log(f"⚡ Checking currencies with {workers} parallel browsers")
+                with tqdm(total=len(indexes), desc="Processing currencies", ncols=100, unit="option") as progress:
+                    with ThreadPoolExecutor(max_workers=workers) as executor:
+                        checked += [pair for share_results in
+                                    executor.map(lambda share: self.check_currency_share(share, progress), shares)
+                                    for pair in share_results]
+            # Merge in the footer's order regardless of which worker finished first
+            self.results.extend(result for _, result in sorted(checked, key=lambda pair: pair[0]))
         except Exception as e:
             self.log(f"❌ Critical Test Error: {e}")
             return False
         finally:
-            if self.driver:
-                self.driver.quit()
+            self.release_driver()
+            if self.owns_pool:
+                self.pool.close_all()
         return True
 
     def generate_excel_report(self):
         try:
-            os.makedirs('reports', exist_ok=True)
-            report_file = 'reports/all_the_reports.xlsx'
-
-            if os.path.exists(report_file):
-                workbook = openpyxl.load_workbook(report_file)
-                if "Currency" not in workbook.sheetnames:
-                    sheet = workbook.create_sheet(title="Currency")
-                else:
-                    sheet = workbook["Currency"]
-            else:
-                workbook = openpyxl.Workbook()
-                sheet = workbook.active
-                sheet.title = "Currency"
-
-            headers = ['Page URL', 'Currency', 'Status', 'Comments']
-            for col, header in enumerate(headers, 1):
-                cell = sheet.cell(row=1, column=col)
-                cell.value = header
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-
-            for row, result in enumerate(self.results, start=2):
-                sheet.cell(row=row, column=1, value=result.get('url', ''))
-                sheet.cell(row=row, column=2, value=result.get('currency', ''))
-                sheet.cell(row=row, column=3, value=result.get('status', ''))
-                sheet.cell(row=row, column=4, value=result.get('comments', ''))
-
-            for col in range(1, 5):
-                column_letter = get_column_letter(col)
-                max_length = max(len(str(cell.value or '')) for cell in sheet[get_column_letter(col)])
-                sheet.column_dimensions[column_letter].width = max_length + 2
-
-            workbook.save(report_file)
-            self.log(f"✅ Excel Report generated: {report_file}")
+            report_file = write_results('Currency', self.results, self.sink, suite='currency')
+            self.log(f"✅ Currency results saved to: {report_file or 'shared report'}")
             return report_file
         except Exception as e:
             self.log(f"❌ Error generating Excel report: {e}")
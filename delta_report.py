@@ -0,0 +1,92 @@
+# delta_report.py
+import argparse
+from collections import defaultdict
+from results_store import ResultsStore, STORE_FILE
+
+
+DEFAULT_WINDOW = 10
+DEFAULT_FLAP_THRESHOLD = 2
+
+
+def compute_delta(store, run_id=None, window=DEFAULT_WINDOW, flap_threshold=DEFAULT_FLAP_THRESHOLD):
+    """
+    Compare a run (the latest by default) with the previous run of each suite.
+    Items are keyed by (suite, page_url, testcase), i.e. (url, currency) for
+    the currency suite. Returns rows for new failures, resolved failures and
+    items whose status changed at least `flap_threshold` times in the last
+    `window` runs. Only indexed lookups over the window are used.
+    """
+    run_id = run_id or store.latest_run()
+    if run_id is None:
+        return []
+    runs = store.runs_up_to(run_id, window)
+    suite_runs = store.suites_by_run(runs)
+    failures = store.failures_by_run(runs)
+
+    # Runs (oldest first) in which each suite actually ran
+    runs_for_suite = defaultdict(list)
+    for run in sorted(runs):
+        for suite in suite_runs.get(run, ()):
+            runs_for_suite[suite].append(run)
+
+    # (suite, page_url, testcase) -> {run_id: comments} for failing runs
+    history = defaultdict(dict)
+    for run, suite, page_url, testcase, comments in failures:
+        history[(suite, page_url, testcase)][run] = comments
+
+    rows = []
+    for key, failed_runs in history.items():
+        suite, page_url, testcase = key
+        ran = runs_for_suite[suite]
+        if run_id not in ran:
+            continue
+        position = ran.index(run_id)
+        previous = ran[position - 1] if position > 0 else None
+        row = {'suite': suite, 'page_url': page_url, 'testcase': testcase}
+
+        if previous is not None:
+            failing_now, failing_before = run_id in failed_runs, previous in failed_runs
+            if failing_now and not failing_before:
+                rows.append(dict(row, change='New failure', comments=failed_runs[run_id]))
+            elif failing_before and not failing_now:
+                rows.append(dict(row, change='Resolved', comments=failed_runs[previous]))
+
+        states = [run in failed_runs for run in ran[:position + 1]]
+        flips = sum(1 for before, after in zip(states, states[1:]) if before != after)
+        if flips >= flap_threshold:
+            rows.append(dict(row, change='Flapping',
+                             comments=f"Status changed {flips} times in the last {len(states)} runs"))
+
+    order = {'New failure': 0, 'Resolved': 1, 'Flapping': 2}
+    rows.sort(key=lambda r: (order[r['change']], r['suite'], r['page_url'] or '', r['testcase'] or ''))
+    return rows
+
+
+def print_delta(rows):
+    counts = defaultdict(int)
+    for row in rows:
+        counts[row['change']] += 1
+    print(f"📊 Delta vs previous run: {counts['New failure']} new failures, "
+          f"{counts['Resolved']} resolved, {counts['Flapping']} flapping")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show what changed between runs.")
+    parser.add_argument('--store', default=STORE_FILE)
+    parser.add_argument('--run', type=int, help="Run id to compare with its predecessor (default: latest)")
+    parser.add_argument('--window', type=int, default=DEFAULT_WINDOW,
+                        help="Runs to look back for flapping items (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    store = ResultsStore(args.store)
+    try:
+        rows = compute_delta(store, args.run, args.window)
+        for row in rows:
+            print(f"{row['change']}\t{row['suite']}\t{row['page_url']}\t{row['testcase']}\t{row['comments']}")
+        print_delta(rows)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# driver_pool.py
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from browser_profile import DEFAULT_PROFILE
+from driver_resolver import resolve_driver_path, last_resolution
+from instrumentation import span, traced
+
+
+DEFAULT_POOL_SIZE = 1
+
+
+def build_chrome_options(profile=DEFAULT_PROFILE):
+    """
+    Chrome options shared by every pooled browser.
+    """
+    return profile.chrome_options()
+
+
+class DriverPool:
+    def __init__(self, size=DEFAULT_POOL_SIZE, options=None, profile=None):
+        """
+        Pool of up to `size` Chrome sessions handed out to the testers.
+        Browsers are started lazily, reset between uses and all shut down by close_all().
+        They are launched with `profile` (headless and resource-blocking by default).
+        """
+        self.size = max(1, int(size))
+        self.profile = profile or DEFAULT_PROFILE
+        self.options = options or build_chrome_options(self.profile)
+        self.service = None
+        self.launch_times = []
+        self._idle = []
+        self._drivers = []
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _get_service(self):
+        # The driver binary is resolved once per process (set CHROMEDRIVER_PATH to pin a local driver)
+        with self._lock:
+            if self.service is None:
+                self.service = Service(resolve_driver_path())
+            return self.service
+
+    def _start_driver(self):
+        service = self._get_service()
+        started = time.perf_counter()
+        with span('browser.launch'):
+            driver = webdriver.Chrome(service=service, options=self.options)
+            self.profile.apply(driver)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._drivers.append(driver)
+            self.launch_times.append(elapsed)
+        logging.info(f"Started pooled browser ({len(self._drivers)}/{self.size}) in {elapsed:.2f}s")
+        return driver
+
+    def acquire(self, timeout=None, profile=None):
+        """
+        Take a browser from the pool, starting one if none is idle.
+        Blocks while all `size` browsers are in use. A `profile` other than the
+        pool's swaps in its block list until the browser is released (whether
+        the browser is headless is fixed when the pool starts it).
+        """
+        if self._closed:
+            raise RuntimeError("Driver pool is closed")
+        with span('browser.wait_for_slot'):
+            acquired = self._slots.acquire(timeout=timeout)
+        if not acquired:
+            raise TimeoutError("Timed out waiting for a pooled browser")
+        try:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            driver = driver or self._start_driver()
+            if profile is not None and profile is not self.profile:
+                profile.apply(driver)
+            return driver
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, driver):
+        """
+        Reset a browser and return it to the pool. Browsers that fail to reset are discarded.
+        """
+        if driver is None:
+            return
+        try:
+            if self._closed:
+                self._discard(driver)
+            elif self.reset(driver):
+                with self._lock:
+                    self._idle.append(driver)
+            else:
+                self._discard(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self):
+        """
+        Context manager that acquires a browser and always releases it.
+        """
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    @traced('browser.reset')
+    def reset(self, driver):
+        """
+        Bring a browser back to a clean state: one blank tab, no cookies or storage.
+        """
+        try:
+            handles = driver.window_handles
+            for handle in handles[1:]:
+                driver.switch_to.window(handle)
+                driver.close()
+            driver.switch_to.window(handles[0])
+            # Clears cookies for every domain, not just the current one
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.execute_script("try { localStorage.clear(); sessionStorage.clear(); } catch (e) {}")
+            driver.get("about:blank")
+            # Undo any per-suite profile
+            self.profile.apply(driver)
+            return True
+        except Exception as e:
+            logging.warning(f"Discarding browser that failed to reset: {e}")
+            return False
+
+    def scoped(self, profile=None):
+        """
+        A view of this pool that remembers which browsers it handed out, so
+        they can all be aborted together (see ScopedPool). Its browsers use
+        `profile` when given.
+        """
+        return ScopedPool(self, profile)
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error closing browser: {e}")
+
+    def close_all(self):
+        """
+        Shut down every browser the pool started.
+        """
+        self._closed = True
+        with self._lock:
+            drivers, self._drivers, self._idle = self._drivers, [], []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                logging.warning(f"Error closing browser: {e}")
+        logging.info(f"Closed {len(drivers)} pooled browser(s)")
+        resolution = last_resolution()
+        if self.launch_times and resolution:
+            print(f"⏱️ Browser startup: driver lookup {resolution.seconds:.2f}s ({resolution.source}), "
+                  f"{len(self.launch_times)} launch(es) averaging "
+                  f"{sum(self.launch_times) / len(self.launch_times):.2f}s")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close_all()
+
+
+class ScopedPool:
+    def __init__(self, pool, profile=None):
+        """
+        Hands out browsers from `pool` and tracks the ones currently in use,
+        so a cancelled or timed-out suite can have its browsers killed.
+        `stopped` is set at the same time, for the suite's HTTP work to check.
+        """
+        self.pool = pool
+        self.profile = profile
+        self.size = pool.size
+        self.stopped = threading.Event()
+        self._held = []
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        if self.stopped.is_set():
+            raise RuntimeError("Suite was cancelled")
+        driver = self.pool.acquire(timeout, profile=self.profile)
+        with self._lock:
+            self._held.append(driver)
+        return driver
+
+    def release(self, driver):
+        with self._lock:
+            if driver in self._held:
+                self._held.remove(driver)
+        self.pool.release(driver)
+
+    @contextmanager
+    def session(self):
+        driver = self.acquire()
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def abort(self):
+        """
+        Quit every browser this scope is holding. Pending WebDriver calls in the
+        suite then fail fast and the suite unwinds; the slots are returned to
+        the pool when the suite releases the dead browsers.
+        """
+        self.stopped.set()
+        with self._lock:
+            held = list(self._held)
+        for driver in held:
+            self.pool._discard(driver)
+        return len(held)
+
+    def close_all(self):
+        # The shared pool is owned by whoever created it
+        pass
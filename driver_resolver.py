@@ -0,0 +1,151 @@
+# driver_resolver.py
+import os
+import re
+import json
+import time
+import shutil
+import logging
+import platform
+import threading
+import subprocess
+from webdriver_manager.chrome import ChromeDriverManager
+from instrumentation import span
+
+
+DRIVER_CACHE_FILE = '.cache/chromedriver.json'
+# Pinned driver binary; skips version detection and any network lookup
+DRIVER_PATH_ENV = 'CHROMEDRIVER_PATH'
+# Chrome binary to read the version from, when it is not in a standard place
+CHROME_BINARY_ENV = 'CHROME_BINARY'
+# Set to 1 to never download a driver (air-gapped runners)
+OFFLINE_ENV = 'QA_DRIVER_OFFLINE'
+
+CHROME_BINARIES = ('google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome')
+CHROME_PATHS = {
+    'Darwin': ['/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'],
+    'Windows': [r'C:\Program Files\Google\Chrome\Application\chrome.exe',
+                r'C:\Program Files (x86)\Google\Chrome\Application\chrome.exe'],
+}
+VERSION_RE = re.compile(r'(\d+\.\d+\.\d+\.\d+)')
+
+_resolved = None
+_lock = threading.Lock()
+
+
+class DriverResolution:
+    def __init__(self, path, source, seconds, browser_version=None):
+        """
+        Where the driver binary came from ('pinned', 'cache', 'download' or
+        'path') and how long resolving it took.
+        """
+        self.path = path
+        self.source = source
+        self.seconds = seconds
+        self.browser_version = browser_version
+
+    def __repr__(self):
+        return (f"DriverResolution(source={self.source!r}, seconds={self.seconds:.3f}, "
+                f"browser_version={self.browser_version!r}, path={self.path!r})")
+
+
+def chrome_version():
+    """
+    Installed Chrome version (e.g. '131.0.6778.87') without any network access, or None.
+    """
+    if platform.system() == 'Windows':
+        try:
+            output = subprocess.run(['reg', 'query', r'HKCU\Software\Google\Chrome\BLBeacon', '/v', 'version'],
+                                    capture_output=True, text=True, timeout=5).stdout
+            match = VERSION_RE.search(output)
+            if match:
+                return match.group(1)
+        except (OSError, subprocess.SubprocessError):
+            pass
+    candidates = [os.environ.get(CHROME_BINARY_ENV)]
+    candidates += [shutil.which(name) for name in CHROME_BINARIES]
+    candidates += CHROME_PATHS.get(platform.system(), [])
+    for binary in candidates:
+        if not binary or not os.path.exists(binary):
+            continue
+        try:
+            output = subprocess.run([binary, '--version'], capture_output=True, text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = VERSION_RE.search(output)
+        if match:
+            return match.group(1)
+    return None
+
+
+def load_driver_cache(path=DRIVER_CACHE_FILE):
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_driver_cache(mapping, path=DRIVER_CACHE_FILE):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_file = f"{path}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as handle:
+        json.dump(mapping, handle, indent=2, sort_keys=True)
+    os.replace(temp_file, path)
+
+
+def _resolve(cache_file):
+    pinned = os.environ.get(DRIVER_PATH_ENV)
+    if pinned:
+        if not os.path.exists(pinned):
+            raise FileNotFoundError(f"{DRIVER_PATH_ENV} points to a missing file: {pinned}")
+        return pinned, 'pinned', None
+
+    version = chrome_version()
+    mapping = load_driver_cache(cache_file)
+    cached = mapping.get(version) if version else None
+    if cached and os.path.exists(cached):
+        return cached, 'cache', version
+
+    offline = os.environ.get(OFFLINE_ENV, '').lower() in ('1', 'true', 'yes')
+    if not offline:
+        try:
+            path = ChromeDriverManager().install()
+            if version:
+                mapping[version] = path
+                save_driver_cache(mapping, cache_file)
+            return path, 'download', version
+        except Exception as e:
+            logging.warning(f"ChromeDriverManager could not resolve a driver: {e}")
+
+    on_path = shutil.which('chromedriver')
+    if on_path:
+        return on_path, 'path', version
+    raise RuntimeError(f"No chromedriver found for Chrome {version or '(unknown version)'}; "
+                       f"set {DRIVER_PATH_ENV} to a local driver binary")
+
+
+def resolve_driver_path(cache_file=DRIVER_CACHE_FILE):
+    """
+    Path to a chromedriver matching the installed Chrome, resolved once per process.
+    Tries, in order: the CHROMEDRIVER_PATH pin, the on-disk Chrome version ->
+    driver map, ChromeDriverManager (skipped when QA_DRIVER_OFFLINE=1) and a
+    chromedriver on PATH.
+    """
+    global _resolved
+    with _lock:
+        if _resolved is None:
+            started = time.perf_counter()
+            with span('driver.resolve'):
+                path, source, version = _resolve(cache_file)
+            _resolved = DriverResolution(path, source, time.perf_counter() - started, version)
+            logging.info(f"Resolved chromedriver from {source} in {_resolved.seconds:.3f}s: {path}")
+        return _resolved.path
+
+
+def last_resolution():
+    """
+    The DriverResolution of this process, or None if no driver was resolved yet.
+    """
+    return _resolved
@@ -0,0 +1,244 @@
+# fixture_site.py
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from html import escape
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+
+# Base currency the pages are rendered in, and the options offered in the footer
+BASE_CURRENCY = 'EUR'
+CURRENCY_RATES = {
+    'USD': ('US Dollar', 1.08), 'GBP': ('British Pound', 0.85), 'JPY': ('Japanese Yen', 162.4),
+    'CHF': ('Swiss Franc', 0.96), 'SEK': ('Swedish Krona', 11.3), 'AUD': ('Australian Dollar', 1.64),
+}
+# 1x1 transparent PNG
+PIXEL_PNG = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082'
+)
+
+CURRENCY_SCRIPT = """
+document.querySelectorAll('#js-currency-sort-footer li').forEach(function (option) {
+    option.addEventListener('click', function () {
+        var code = option.getAttribute('data-currency');
+        fetch('/api/prices?page=%(page)d&currency=' + code)
+            .then(function (response) { return response.json(); })
+            .then(function (data) {
+                document.querySelectorAll('.js-price-value').forEach(function (el, i) {
+                    el.textContent = code + ' ' + data.prices[i].toFixed(2);
+                });
+            });
+    });
+});
+"""
+
+
+class FixtureConfig:
+    def __init__(self, pages=20, headings=12, images=20, links=50, broken_ratio=0.1, missing_alt_ratio=0.1,
+                 prices=8, latency=0.0, script_data_size=2000, seed=1, misordered_ratio=0.0):
+        """
+        Shape of the synthetic site: `pages` property pages, each with
+        `headings` headings (`misordered_ratio` of the pages with an outline
+        that steps back up a level), `images` images (`missing_alt_ratio`
+        without alt), `links` outgoing links (`broken_ratio` of them 404) and
+        `prices` prices. Every response is delayed by `latency` seconds.
+        """
+        self.pages = pages
+        self.headings = headings
+        self.images = images
+        self.links = links
+        self.broken_ratio = broken_ratio
+        self.missing_alt_ratio = missing_alt_ratio
+        self.prices = prices
+        self.latency = latency
+        self.script_data_size = script_data_size
+        self.seed = seed
+        self.misordered_ratio = misordered_ratio
+
+
+def is_broken(page, index, ratio):
+    # Deterministic, evenly spread 404s, so every run checks the same links
+    return ratio > 0 and int((index + 1) * ratio) != int(index * ratio)
+
+
+def base_prices(config, page):
+    rng = random.Random(config.seed * 1000 + page)
+    return [round(rng.uniform(40, 400), 2) for _ in range(config.prices)]
+
+
+def property_path(page):
+    return f"/property/fixture/FX-{page}"
+
+
+def render_property_page(config, page):
+    rng = random.Random(config.seed * 1000 + page)
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'>",
+             f"<title>Fixture property {page}</title></head><body>",
+             "<header><nav>"]
+    parts += [f"<a href='/property/fixture/FX-{other}'>Property {other}</a>"
+              for other in range(max(0, page - 2), min(config.pages, page + 3)) if other != page]
+    parts.append("</nav></header><main>")
+
+    parts.append(f"<h1>Fixture property {page}</h1>")
+    level = 2
+    for i in range(1, config.headings):
+        # Walk down the outline without skipping levels or going back up, so the sequence check passes
+        level = rng.choice([level, min(4, level + 1)])
+        parts.append(f"<h{level}>Section {i}</h{level}><p>{'Lorem ipsum dolor sit amet. ' * 4}</p>")
+    if is_broken(page, page, config.misordered_ratio):
+        # A closing section back up at h2 after an h4, which the sequence check fails
+        parts.append("<h4>Notes</h4><p>Lorem ipsum.</p><h2>Contact</h2><p>Lorem ipsum.</p>")
+
+    for i in range(config.images):
+        alt = '' if is_broken(page, i, config.missing_alt_ratio) else f" alt='Photo {i} of property {page}'"
+        parts.append(f"<img src='/img/{page}-{i}.png'{alt} width='320' height='240'>")
+
+    parts.append("<section id='prices'>")
+    parts += [f"<span class='js-price-value'>{BASE_CURRENCY} {price:.2f}</span>"
+              for price in base_prices(config, page)]
+    parts.append("</section><section id='links'>")
+    parts += [f"<a href='/link/{page}/{i}'>Link {i}</a>" for i in range(config.links)]
+    parts.append("</section></main><footer>")
+
+    parts.append("<div id='js-currency-sort-footer'><ul class='select-ul'>")
+    parts += [f"<li data-currency='{code}'>{escape(name)} ({code})</li>" for code, (name, _) in CURRENCY_RATES.items()]
+    parts.append("</ul></div></footer>")
+
+    script_data = {
+        'config': {'SiteUrl': 'https://fixture.local', 'SiteName': 'Fixture Rentals'},
+        'userInfo': {'Browser': 'Chrome', 'CountryCode': 'ES', 'IP': '127.0.0.1'},
+        'pageData': {'CampaignId': f"CMP-{page}", 'Filler': 'x' * config.script_data_size},
+    }
+    parts.append(f"<script>window.ScriptData = {json.dumps(script_data)};</script>")
+    parts.append(f"<script>{CURRENCY_SCRIPT % {'page': page}}</script>")
+    parts.append("</body></html>")
+    return ''.join(parts)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def log_message(self, format, *args):
+        logging.debug(f"fixture: {format % args}")
+
+    def send_body(self, status, body, content_type='text/html; charset=utf-8', head=False):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        etag = f'"{len(body)}"'
+        if status == 200 and self.headers.get('If-None-Match') == etag:
+            # Unchanged since the client's copy, as a real server with ETags would answer
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        if status == 200:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def route(self, head=False):
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        parts = urlsplit(self.path)
+        path, query = parts.path, parse_qs(parts.query)
+        segments = [segment for segment in path.split('/') if segment]
+
+        if path == '/':
+            links = ''.join(f"<a href='{property_path(page)}'>Property {page}</a>" for page in range(self.config.pages))
+            return self.send_body(200, f"<html><body><h1>Fixture Rentals</h1>{links}</body></html>", head=head)
+        if path == '/sitemap.xml':
+            host = f"http://{self.headers.get('Host')}"
+            urls = ''.join(f"<url><loc>{host}{property_path(page)}</loc></url>" for page in range(self.config.pages))
+            return self.send_body(200, '<?xml version="1.0" encoding="UTF-8"?><urlset '
+                                  f'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{urls}</urlset>',
+                                  'application/xml', head)
+        if len(segments) == 3 and segments[0] == 'property' and segments[2].startswith('FX-'):
+            page = int(segments[2][3:])
+            if page >= self.config.pages:
+                return self.send_body(404, "Not found", head=head)
+            return self.send_body(200, render_property_page(self.config, page), head=head)
+        if len(segments) == 3 and segments[0] == 'link':
+            page, index = int(segments[1]), int(segments[2])
+            if is_broken(page, index, self.config.broken_ratio):
+                return self.send_body(404, "Not found", head=head)
+            return self.send_body(200, f"<html><body>Link {index}</body></html>", head=head)
+        if len(segments) == 2 and segments[0] == 'img':
+            return self.send_body(200, PIXEL_PNG, 'image/png', head)
+        if path == '/api/prices':
+            page = int(query.get('page', ['0'])[0])
+            code = query.get('currency', [BASE_CURRENCY])[0].upper()
+            rate = CURRENCY_RATES.get(code, (None, 1.0))[1]
+            prices = [round(price * rate, 2) for price in base_prices(self.config, page)]
+            return self.send_body(200, json.dumps({'currency': code, 'prices': prices}), 'application/json', head)
+        return self.send_body(404, "Not found", head=head)
+
+    def do_GET(self):
+        self.route()
+
+    def do_HEAD(self):
+        self.route(head=True)
+
+
+class FixtureSite:
+    def __init__(self, config=None, host='127.0.0.1', port=0):
+        """
+        Local stand-in for the live site, served from a background thread.
+        Port 0 picks a free port; base_url is set once started.
+        """
+        self.config = config or FixtureConfig()
+        self.server = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.server.daemon_threads = True
+        self.server.config = self.config
+        self.base_url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def page_urls(self):
+        return [f"{self.base_url}{property_path(page)}" for page in range(self.config.pages)]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name='fixture-site', daemon=True)
+        self._thread.start()
+        logging.info(f"Fixture site serving {self.config.pages} pages at {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the synthetic property site.")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args(argv)
+    site = FixtureSite(FixtureConfig(pages=args.pages, latency=args.latency), port=args.port)
+    print(f"✅ Fixture site at {site.base_url}/ (sitemap: {site.base_url}/sitemap.xml)")
+    try:
+        site.server.serve_forever()
+    except KeyboardInterrupt:
+        site.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# host_limiter.py
+import time
+import random
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from instrumentation import span
+
+
+DEFAULT_HOST_CONCURRENCY = 4   # requests in flight per host
+DEFAULT_HOST_RATE = 10.0       # request starts per second per host
+BACKOFF_BASE = 0.5             # seconds; doubled on every retry
+BACKOFF_CAP = 30.0
+MAX_RETRY_AFTER = 60.0         # longer Retry-After values are not waited for
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """
+    Exponential backoff with full jitter for retry number `attempt` (0-based).
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_after_seconds(value):
+    """
+    Parse a Retry-After header (seconds or an HTTP date); None if absent or invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class HostState:
+    def __init__(self, concurrency):
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+        self.blocked_until = 0.0
+
+
+class HostLimiter:
+    def __init__(self, concurrency=DEFAULT_HOST_CONCURRENCY, rate=DEFAULT_HOST_RATE):
+        """
+        Per-host request scheduler shared by all link-check workers: at most
+        `concurrency` requests in flight and `rate` request starts per second
+        for each host, and no requests to a host while it is backing off.
+        Different hosts never wait on each other.
+        """
+        self.concurrency = max(1, int(concurrency))
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                state = self._hosts[host] = HostState(self.concurrency)
+            return state
+
+    @contextmanager
+    def slot(self, url):
+        """
+        Context manager that holds one request slot for the host of `url`,
+        waiting for the host's rate limit and any backoff first.
+        """
+        state = self._state(host_of(url))
+        with span('link.host_wait', 'http'):
+            state.slots.acquire()
+            try:
+                while True:
+                    with state.lock:
+                        now = time.monotonic()
+                        start_at = max(state.next_start, state.blocked_until, now)
+                        if start_at <= now:
+                            state.next_start = now + self.interval
+                            break
+                    time.sleep(start_at - now)
+            except BaseException:
+                state.slots.release()
+                raise
+        try:
+            yield
+        finally:
+            state.slots.release()
+
+    def back_off(self, url, delay):
+        """
+        Hold every request to the host of `url` for `delay` seconds.
+        """
+        state = self._state(host_of(url))
+        with state.lock:
+            state.blocked_until = max(state.blocked_until, time.monotonic() + delay)
+
+
+def interleave_by_host(items, key=lambda item: item):
+    """
+    Reorder `items` round-robin by host, so concurrent workers spread over
+    many hosts instead of queueing on one. Returns (original index, item) pairs.
+    """
+    queues = {}
+    for index, item in enumerate(items):
+        queues.setdefault(host_of(key(item)), []).append((index, item))
+    ordered = []
+    queues = list(queues.values())
+    for position in range(max((len(queue) for queue in queues), default=0)):
+        ordered.extend(queue[position] for queue in queues if position < len(queue))
+    return ordered
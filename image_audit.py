@@ -0,0 +1,245 @@
+# image_audit.py
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from link_checker import LinkChecker, CheckStopped
+from host_limiter import interleave_by_host
+from instrumentation import span, count
+
+
+# Order of the values the page snapshot holds for every <img>; the static parser fills the first six
+IMAGE_FIELDS = ('src', 'alt', 'srcset', 'width', 'height', 'loading',
+                'natural_width', 'natural_height', 'rendered_width', 'rendered_height', 'top')
+
+DEFAULT_MAX_IMAGE_KB = 300
+DEFAULT_IMAGE_WORKERS = 32
+# Served this many times wider or narrower than displayed (after device pixel ratio) counts as mis-sized
+SCALE_FACTOR = 2.0
+# Declared and actual aspect ratios may differ this much (relative) before the image is distorted
+ASPECT_TOLERANCE = 0.05
+# Content types some servers use for images
+GENERIC_TYPES = {'application/octet-stream', 'binary/octet-stream'}
+# Offenders named in one report comment
+MAX_LISTED = 20
+
+
+def image_record(values):
+    """
+    Snapshot values of one <img> as a dict keyed by IMAGE_FIELDS (missing fields are None).
+    """
+    return {field: values[i] if i < len(values) else None for i, field in enumerate(IMAGE_FIELDS)}
+
+
+def srcset_urls(srcset, base_url=''):
+    """
+    Absolute URLs of the candidates in a srcset attribute ("a.jpg 1x, b.jpg 2x").
+    A URL runs up to the next whitespace, so data: URIs with commas survive.
+    """
+    text, urls, position = srcset or '', [], 0
+    while position < len(text):
+        while position < len(text) and (text[position].isspace() or text[position] == ','):
+            position += 1
+        start = position
+        while position < len(text) and not text[position].isspace():
+            position += 1
+        url = text[start:position]
+        if not url:
+            break
+        if url.endswith(','):
+            url = url.rstrip(',')
+        else:
+            # Skip this candidate's descriptors
+            end = text.find(',', position)
+            position = len(text) if end < 0 else end + 1
+        urls.append(urljoin(base_url, url))
+    return urls
+
+
+def image_urls(image, base_url=''):
+    urls = [image['src']] if image['src'] else []
+    return urls + [url for url in srcset_urls(image['srcset'], base_url) if url not in urls]
+
+
+def as_pixels(value):
+    match = re.fullmatch(r'\s*(\d+)(px)?\s*', str(value)) if value is not None else None
+    return int(match.group(1)) if match else None
+
+
+def content_size(response):
+    """
+    Full size of the resource in bytes: the total of a Content-Range, else
+    Content-Length; None if the server does not say.
+    """
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    if total.isdigit():
+        return int(total)
+    if response.status_code == 206:
+        return None
+    length = response.headers.get('Content-Length', '')
+    return int(length) if length.isdigit() else None
+
+
+def broken_reason(probe):
+    if probe['error']:
+        return probe['error']
+    if probe['status'] >= 400:
+        return f"HTTP {probe['status']}"
+    content_type = probe['type']
+    if content_type and not content_type.startswith('image/') and content_type not in GENERIC_TYPES:
+        return f"served as {content_type}"
+    return None
+
+
+def sizing_problem(image, pixel_ratio=1):
+    """
+    Why the image is mis-sized, or None. Needs the natural size, so images
+    the browser did not load (blocked, lazy or broken) are only checked for
+    their width/height attributes.
+    """
+    shown_w, shown_h = image['rendered_width'], image['rendered_height']
+    if shown_w == 0 or shown_h == 0:
+        # Hidden, nothing to lay out
+        return None
+    declared_w, declared_h = as_pixels(image['width']), as_pixels(image['height'])
+    if declared_w is None or declared_h is None:
+        return "no width/height attributes, the layout shifts when it loads"
+    natural_w, natural_h = image['natural_width'], image['natural_height']
+    if not natural_w or not natural_h:
+        return None
+    if declared_h and abs(declared_w / declared_h - natural_w / natural_h) > ASPECT_TOLERANCE * natural_w / natural_h:
+        return f"declared {declared_w}x{declared_h}, image is {natural_w}x{natural_h}"
+    if shown_w:
+        needed = shown_w * (pixel_ratio or 1)
+        if natural_w > needed * SCALE_FACTOR:
+            return f"{natural_w}x{natural_h} shown at {shown_w}x{shown_h}"
+        if natural_w * SCALE_FACTOR < needed:
+            return f"{natural_w}x{natural_h} stretched to {shown_w}x{shown_h}"
+    return None
+
+
+def needs_lazy_loading(image, viewport_height):
+    # Below the fold on first paint and still fetched eagerly
+    top = image['top']
+    if top is None or not viewport_height or not image['rendered_width']:
+        return False
+    return top > viewport_height and (image['loading'] or '').lower() != 'lazy'
+
+
+def listed(offenders):
+    names = list(offenders)
+    more = f" and {len(names) - MAX_LISTED} more" if len(names) > MAX_LISTED else ''
+    return f"{names[:MAX_LISTED]}{more}"
+
+
+def image_row(page_url, testcase, offenders, passed, failed):
+    return {
+        'page_url': page_url,
+        'testcase': testcase,
+        'status': 'Fail' if offenders else 'Pass',
+        'comments': f"{len(offenders)} {failed}: {listed(offenders)}" if offenders else passed
+    }
+
+
+def audit_images(page_url, snapshot, probes, max_bytes=DEFAULT_MAX_IMAGE_KB * 1024):
+    """
+    Report rows (Test sheet schema) for the images in a page snapshot, given
+    the probe result of every image URL: broken images, images over
+    `max_bytes`, mis-sized images and below-the-fold images without lazy loading.
+    """
+    images = [image_record(values) for values in snapshot['images']]
+    viewport_height, pixel_ratio = snapshot.get('viewport') or (None, 1)
+    base_url = snapshot.get('base') or page_url
+    # Offender -> description, so an image used many times is listed once
+    broken, heavy, missized, eager = {}, {}, {}, {}
+    for image in images:
+        for url in image_urls(image, base_url):
+            probe = probes.get(url)
+            if probe is None:
+                continue
+            reason = broken_reason(probe)
+            if reason:
+                broken[f"{url} ({reason})"] = True
+            elif probe['bytes'] and probe['bytes'] > max_bytes:
+                heavy[f"{url} ({probe['bytes'] // 1024} KB)"] = True
+        problem = sizing_problem(image, pixel_ratio)
+        if problem:
+            missized[f"{image['src']} ({problem})"] = True
+        if needs_lazy_loading(image, viewport_height):
+            eager[image['src']] = True
+
+    return [
+        image_row(page_url, 'Broken Images', broken, f"All {len(probes)} image URLs load", 'broken image URLs'),
+        image_row(page_url, 'Image Weight', heavy, f"No image over {max_bytes // 1024} KB",
+                  f"images over {max_bytes // 1024} KB"),
+        image_row(page_url, 'Image Dimensions', missized, f"All {len(images)} images sized for how they are shown",
+                  'mis-sized images'),
+        image_row(page_url, 'Image Lazy Loading', eager, "Every image below the fold is lazy-loaded",
+                  'images below the fold without loading="lazy"'),
+    ]
+
+
+class ImageProber:
+    def __init__(self, max_workers=DEFAULT_IMAGE_WORKERS, checker=None, response_cache=None, limiter=None,
+                 stop=None):
+        """
+        Probe image URLs for status, size and content type with HEAD requests,
+        `max_workers` at a time and interleaved across hosts. Requests go
+        through `checker` (a LinkChecker, for its session, per-host limits and
+        retries); a private one sharing the run's `limiter` is used when not given.
+        Probing ends once the `stop` event is set.
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.owns_checker = checker is None
+        self.checker = checker or LinkChecker(max_workers=self.max_workers, response_cache=response_cache,
+                                              limiter=limiter, stop=stop)
+
+    def probe(self, url):
+        """
+        {'status', 'bytes', 'type', 'error'} for one image URL.
+        """
+        count('image.probes')
+        try:
+            with span('image.probe', 'http', url=url):
+                response = self.checker.head(url)
+                size = content_size(response)
+                if size is None and response.ok:
+                    # No length on the HEAD (chunked): ask for one byte and read the total from Content-Range
+                    with self.checker.limiter.slot(url):
+                        response = self.checker.session.get(url, headers={'Range': 'bytes=0-0'}, stream=True,
+                                                            timeout=self.checker.timeout, allow_redirects=True)
+                    response.close()
+                    size = content_size(response)
+        except CheckStopped:
+            raise
+        except Exception as e:
+            return {'status': None, 'bytes': None, 'type': None, 'error': f"Error: {e}"}
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        return {'status': response.status_code, 'bytes': size, 'type': content_type, 'error': None}
+
+    def probe_all(self, urls):
+        """
+        {url: probe result} for the unique http(s) URLs in `urls`.
+        """
+        unique = list(dict.fromkeys(url for url in urls if url and url.startswith(('http://', 'https://'))))
+        if not unique:
+            return {}
+        ordered = [url for _, url in interleave_by_host(unique)]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(ordered))) as executor:
+            return dict(zip(ordered, executor.map(self.probe, ordered)))
+
+    def close(self):
+        if self.owns_checker:
+            self.checker.close()
+
+
+def audit_page_images(page_url, snapshot, prober, max_bytes=DEFAULT_MAX_IMAGE_KB * 1024):
+    """
+    Probe every image URL of a page snapshot (src and srcset candidates) and
+    return the audit rows.
+    """
+    base_url = snapshot.get('base') or page_url
+    urls = []
+    for values in snapshot['images']:
+        urls += image_urls(image_record(values), base_url)
+    probes = prober.probe_all(urls)
+    return audit_images(page_url, snapshot, probes, max_bytes)
@@ -0,0 +1,186 @@
+# instrumentation.py
+import os
+import json
+import time
+import logging
+import threading
+from functools import wraps
+from collections import defaultdict
+
+
+TRACE_FILE = 'reports/trace.json'
+# Raw events kept for the trace file; the summary keeps counting past this
+MAX_TRACE_EVENTS = 200000
+
+_enabled = False
+_lock = threading.Lock()
+_events = []
+_dropped = 0
+_stats = {}
+_counters = defaultdict(int)
+_thread_names = {}
+_origin = time.perf_counter()
+
+
+class _NoSpan:
+    # Shared do-nothing span handed out while instrumentation is disabled
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'category', 'args', 'started')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record(self.name, self.category, self.started, time.perf_counter() - self.started, self.args,
+                failed=exc_type is not None)
+        return False
+
+
+def _record(name, category, started, duration, args, failed=False):
+    global _dropped
+    thread = threading.current_thread()
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = {'count': 0, 'total': 0.0, 'max': 0.0, 'errors': 0}
+        stat['count'] += 1
+        stat['total'] += duration
+        stat['max'] = max(stat['max'], duration)
+        stat['errors'] += failed
+        if len(_events) >= MAX_TRACE_EVENTS:
+            _dropped += 1
+            return
+        _thread_names[thread.ident] = thread.name
+        event = {'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': thread.ident,
+                 'ts': round((started - _origin) * 1e6, 1), 'dur': round(duration * 1e6, 1)}
+        if args or failed:
+            event['args'] = dict(args, error=True) if failed else args
+        _events.append(event)
+
+
+def enable():
+    """
+    Start recording spans and counters (everything recorded so far is kept).
+    """
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    global _dropped
+    with _lock:
+        _events.clear()
+        _stats.clear()
+        _counters.clear()
+        _thread_names.clear()
+        _dropped = 0
+
+
+def span(name, category='qa', **args):
+    """
+    Context manager timing the block as one `name` span. Returns a shared
+    no-op object while instrumentation is disabled.
+    """
+    if not _enabled:
+        return NO_SPAN
+    return _Span(name, category, args)
+
+
+def traced(name, category='qa'):
+    """
+    Decorator timing every call of the function as a `name` span.
+    """
+    def decorate(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(name, category, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1):
+    """
+    Add `value` to the counter `name`.
+    """
+    if _enabled:
+        with _lock:
+            _counters[name] += value
+
+
+def summary():
+    """
+    [(name, count, total seconds, mean seconds, max seconds, errors)] sorted by total time.
+    """
+    with _lock:
+        rows = [(name, s['count'], s['total'], s['total'] / s['count'], s['max'], s['errors'])
+                for name, s in _stats.items()]
+    return sorted(rows, key=lambda row: row[2], reverse=True)
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def print_summary():
+    rows = summary()
+    if not rows and not _counters:
+        return
+    print("⏱️ Time by step:")
+    print(f"   {'step':<28} {'calls':>7} {'total s':>9} {'mean ms':>9} {'max ms':>9} {'errors':>7}")
+    for name, calls, total, mean, longest, errors in rows:
+        print(f"   {name:<28} {calls:>7} {total:>9.2f} {mean * 1000:>9.1f} {longest * 1000:>9.1f} {errors:>7}")
+    for name, value in sorted(counters().items()):
+        print(f"   {name:<28} {value:>7}")
+
+
+def export_chrome_trace(path=TRACE_FILE):
+    """
+    Write the recorded spans as Chrome trace JSON (open in chrome://tracing or Perfetto).
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _lock:
+        events = list(_events)
+        names = dict(_thread_names)
+        other = {'counters': dict(_counters), 'dropped_events': _dropped}
+    pid = os.getpid()
+    events += [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+               for tid, name in names.items()]
+    with open(path, 'w', encoding='utf-8') as handle:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': other}, handle)
+    logging.info(f"Trace written to {path} ({len(events)} events, {_dropped} dropped)")
+    print(f"✅ Trace written to {path}")
+    return path
@@ -0,0 +1,82 @@
+# link_cache.py
+import os
+import time
+import sqlite3
+import logging
+import threading
+
+
+DEFAULT_CACHE_PATH = '.cache/link_status.sqlite'
+DEFAULT_TTL = 24 * 60 * 60  # one day, in seconds
+
+
+class LinkStatusCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL):
+        """
+        Open (or create) the on-disk link status cache.
+        Entries are keyed by normalized URL and expire after `ttl` seconds.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # Sharded runs open the cache from several processes at once
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS link_status ("
+            " url TEXT PRIMARY KEY,"
+            " status INTEGER NOT NULL,"
+            " checked_at REAL NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT)"
+        )
+        self._conn.commit()
+        logging.info(f"Opened link status cache: {path}")
+
+    def get(self, url):
+        """
+        Return the cached entry for `url` as a dict, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, checked_at, etag, last_modified FROM link_status WHERE url = ?",
+                (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {'status': row[0], 'checked_at': row[1], 'etag': row[2], 'last_modified': row[3]}
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['checked_at'] < self.ttl
+
+    def put(self, url, status, etag=None, last_modified=None):
+        """
+        Store the latest status for `url`.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO link_status (url, status, checked_at, etag, last_modified)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (url, status, time.time(), etag, last_modified)
+            )
+            self._conn.commit()
+
+    def touch(self, url):
+        """
+        Mark `url` as freshly checked without changing its status (after a 304).
+        """
+        with self._lock:
+            self._conn.execute("UPDATE link_status SET checked_at = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM link_status")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,456 @@
+# link_checker.py
+import queue
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.adapters import HTTPAdapter
+from tqdm import tqdm
+from instrumentation import span, count
+from work_queue import hand_off
+from response_cache import CachingAdapter
+from host_limiter import (HostLimiter, backoff_delay, retry_after_seconds, interleave_by_host,
+                          MAX_RETRY_AFTER)
+
+
+DEFAULT_TIMEOUT = 10
+# Total workers across all hosts; HostLimiter keeps each single host within its own limit
+DEFAULT_WORKERS = 16
+DEFAULT_MAX_RETRIES = 3
+
+# Query parameters that only carry campaign/click tracking and never change the target
+TRACKING_PARAMS = {'gclid', 'fbclid', 'msclkid', 'dclid', 'yclid', 'mc_cid', 'mc_eid', '_ga', '_gl'}
+TRACKING_PREFIXES = ('utm_',)
+
+# Status codes servers use when they do not support HEAD properly
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 501}
+# Status codes that mean "slow down / try again later"
+RETRY_STATUSES = {429, 503}
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Unique-URL fingerprints kept in memory before de-duplication spills to a temporary database
+SEEN_MEMORY_LIMIT = 100000
+
+
+class CheckStopped(Exception):
+    """
+    Raised inside a check once the checker's `stop` event is set.
+    """
+
+
+def build_session(pool_size=DEFAULT_WORKERS, response_cache=None):
+    """
+    Create a requests Session whose connection pool is sized for `pool_size`
+    concurrent requests, so connections to each host are reused.
+    With a `response_cache` (a ResponseCache), GET and HEAD requests are answered
+    from it where possible and what is fetched is stored, for this run and the next.
+    """
+    session = requests.Session()
+    if response_cache is not None:
+        adapter = CachingAdapter(response_cache, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def is_tracking_param(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(href, strip_tracking=False):
+    """
+    Normalize a link for de-duplication: drop the fragment, lowercase the scheme
+    and host, drop default ports and, optionally, tracking query parameters.
+    Returns None for links that are not http(s).
+    """
+    if not href:
+        return None
+    try:
+        parts = urlsplit(href.strip())
+        scheme = parts.scheme.lower()
+        if scheme not in DEFAULT_PORTS or not parts.hostname:
+            return None
+        host = parts.hostname.rstrip('.').encode('idna').decode('ascii').lower()
+        port = parts.port
+    except (ValueError, UnicodeError):
+        return None
+    # IPv6 literals keep their brackets
+    netloc = f"[{host}]" if ':' in host else host
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    query = parts.query
+    if strip_tracking and query:
+        params = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if not is_tracking_param(k)]
+        query = urlencode(params)
+    return urlunsplit((scheme, netloc, parts.path or '/', query, ''))
+
+
+def collect_links(entries, strip_tracking=False):
+    """
+    Group (href, location) pairs by normalized URL, keeping first-seen order.
+    Returns {normalized_url: [locations...]}.
+    """
+    links = {}
+    for href, location in entries:
+        url = normalize_url(href, strip_tracking)
+        if url is None:
+            continue
+        locations = links.setdefault(url, [])
+        if location and location not in locations:
+            locations.append(location)
+    return links
+
+
+def url_fingerprint(url):
+    # 64-bit digest, so the de-duplication set does not keep whole URLs
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class FingerprintSet:
+    """
+    Set of URL fingerprints with bounded memory: up to `memory_limit` are held
+    in a Python set, after which they move to a temporary on-disk SQLite table.
+    """
+    def __init__(self, memory_limit=SEEN_MEMORY_LIMIT):
+        self.memory_limit = memory_limit
+        self._memory = set()
+        self._db = None
+
+    def add(self, url):
+        """
+        Add `url`; returns True if it was not in the set yet.
+        """
+        # SQLite integers are signed 64-bit
+        fingerprint = url_fingerprint(url) - 2 ** 63
+        if self._db is None:
+            if fingerprint in self._memory:
+                return False
+            self._memory.add(fingerprint)
+            if len(self._memory) >= self.memory_limit:
+                self._spill()
+            return True
+        cursor = self._db.execute("INSERT OR IGNORE INTO seen VALUES (?)", (fingerprint,))
+        return cursor.rowcount == 1
+
+    def _spill(self):
+        # An empty filename gives a private temporary database on disk
+        self._db = sqlite3.connect('', isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE seen (fingerprint INTEGER PRIMARY KEY)")
+        self._db.executemany("INSERT INTO seen VALUES (?)", ((f,) for f in self._memory))
+        self._memory = set()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def with_locations(row, locations):
+    """
+    A failure row with where the link was found added to its comments.
+    """
+    locations = list(locations or [])
+    context = f" (found at: {'; '.join(locations)})" if locations else ''
+    return dict(row, comments=f"{row['comments']}{context}", locations=locations)
+
+
+class LinkChecker:
+    def __init__(self, max_workers=DEFAULT_WORKERS, timeout=DEFAULT_TIMEOUT, session=None,
+                 strip_tracking=False, cache=None, force_recheck=False, limiter=None,
+                 max_retries=DEFAULT_MAX_RETRIES, checkpoint=None, response_cache=None, stop=None):
+        """
+        Initialize the checker with a pooled HTTP session.
+        `cache` is an optional LinkStatusCache; `force_recheck` ignores cached
+        entries (results are still written back to the cache).
+        Requests go through `limiter` (a HostLimiter) so no host gets more than
+        its share; 429/503 responses and connection errors are retried up to
+        `max_retries` times with backoff, honouring Retry-After.
+        With a `checkpoint`, links finished in an earlier attempt are skipped
+        and every finished link is journaled. Once the `stop` event (a
+        threading.Event) is set, no new requests are sent and checks raise
+        CheckStopped.
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.timeout = timeout
+        self.strip_tracking = strip_tracking
+        self.cache = cache
+        self.force_recheck = force_recheck
+        self.session = session or build_session(self.max_workers, response_cache)
+        self.limiter = limiter or HostLimiter()
+        self.max_retries = max(0, int(max_retries))
+        self.checkpoint = checkpoint
+        self.stop = stop
+        self.stats = {'requests': 0, 'head_fallbacks': 0, 'cache_hits': 0, 'revalidated': 0, 'retries': 0}
+        self._stats_lock = threading.Lock()
+
+    def check_stop(self):
+        if self.stop is not None and self.stop.is_set():
+            raise CheckStopped("Link check stopped")
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+        count(f"link.{key}")
+
+    def _request(self, url, headers=None):
+        """
+        HEAD `url`, falling back to a one-byte ranged GET if the server rejects
+        HEAD. The body is never downloaded.
+        """
+        self._count('requests')
+        with self.limiter.slot(url), span('link.head', 'http', url=url):
+            response = self.session.head(url, timeout=self.timeout, allow_redirects=True, headers=headers)
+        response.close()
+        if response.status_code not in HEAD_FALLBACK_STATUSES:
+            return response
+
+        self._count('requests')
+        self._count('head_fallbacks')
+        headers = dict(headers or {}, Range='bytes=0-0')
+        with self.limiter.slot(url), span('link.ranged_get', 'http', url=url):
+            response = self.session.get(url, timeout=self.timeout, allow_redirects=True,
+                                        headers=headers, stream=True)
+        response.close()
+        return response
+
+    def _request_with_retries(self, url, headers=None):
+        """
+        _request() that retries throttling responses and connection errors.
+        The delay applies to the whole host, so other workers slow down too.
+        """
+        for attempt in range(self.max_retries + 1):
+            self.check_stop()
+            try:
+                response = self._request(url, headers)
+            except TRANSIENT_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logging.info(f"Retrying {url} in {delay:.1f}s after a connection error")
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                # Checked before the retry count: a final throttled response with a long Retry-After stopped here
+                delay = retry_after_seconds(response.headers.get('Retry-After'))
+                if delay is not None and delay > MAX_RETRY_AFTER:
+                    logging.warning(f"{url} asked to retry after {delay:.0f}s; not waiting that long")
+                    return response
+                if attempt == self.max_retries:
+                    return response
+                delay = delay if delay is not None else backoff_delay(attempt)
+                logging.info(f"{url} returned {response.status_code}; retrying in {delay:.1f}s")
+            self._count('retries')
+            self.limiter.back_off(url, delay)
+        return response
+
+    def head(self, url, headers=None):
+        """
+        Response to a HEAD of `url` (or a one-byte ranged GET where HEAD is
+        rejected), under the same per-host limits and retries as probe().
+        The link status cache is not used.
+        """
+        return self._request_with_retries(url, headers)
+
+    def probe(self, url):
+        """
+        Return the HTTP status of `url`. Fresh cache entries are used as-is and
+        expired ones are revalidated with a conditional request.
+        """
+        return self._probe(url)[0]
+
+    def _probe(self, url):
+        # (status, Retry-After seconds of a response that is still throttled, else None)
+        entry = None
+        if self.cache and not self.force_recheck:
+            entry = self.cache.get(url)
+            if self.cache.is_fresh(entry):
+                self._count('cache_hits')
+                return entry['status'], None
+
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+
+        response = self._request_with_retries(url, headers)
+        if response.status_code in RETRY_STATUSES:
+            # Still throttled; do not cache a transient status
+            return response.status_code, retry_after_seconds(response.headers.get('Retry-After'))
+        if response.status_code == 304 and entry:
+            self._count('revalidated')
+            self.cache.touch(url)
+            return entry['status'], None
+        if self.cache:
+            self.cache.put(url, response.status_code,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.status_code, None
+
+    def verdict(self, href):
+        """
+        Check a single URL and return its failure row (without where it was
+        found), or None if the link is fine.
+        """
+        logging.info(f"Checking URL: {href}")
+        try:
+            status_code, retry_after = self._probe(href)
+            if status_code == 404:
+                print(f"❌ 404 Not Found: {href}")
+                return {
+                    'page_url': href,
+                    'testcase': 'URL Status Code',
+                    'status': 'Fail',
+                    'comments': '404 Not Found'
+                }
+            if status_code in RETRY_STATUSES:
+                print(f"❌ {status_code} Still throttled: {href}")
+                if retry_after is not None and retry_after > MAX_RETRY_AFTER:
+                    comments = f'{status_code}, Retry-After {retry_after:.0f}s exceeds the {MAX_RETRY_AFTER:.0f}s limit'
+                else:
+                    comments = f'{status_code} after {self.max_retries} retries'
+                return {
+                    'page_url': href,
+                    'testcase': 'URL Status Code',
+                    'status': 'Fail',
+                    'comments': comments
+                }
+            logging.info(f"URL Status Code {status_code}: {href}")
+            return None
+        except CheckStopped:
+            raise
+        except Exception as e:
+            print(f"❌ Error checking URL: {href}")
+            return {
+                'page_url': href,
+                'testcase': 'URL Status Code',
+                'status': 'Fail',
+                'comments': f'Error: {str(e)}'
+            }
+
+    def check_url(self, href, locations=None):
+        """
+        Check a single URL and return a result row, or None if the link is fine.
+        """
+        row = self.verdict(href)
+        return with_locations(row, locations) if row else None
+
+    def _checkpointed_verdict(self, url):
+        # Verdicts from an interrupted run are reused; new ones are journaled
+        if self.checkpoint and self.checkpoint.done('link', url):
+            restored = self.checkpoint.rows('link', url)
+            return restored[0] if restored else None
+        row = self.verdict(url)
+        if self.checkpoint:
+            self.checkpoint.record('link', url, [row])
+        return row
+
+    def check_all(self, links):
+        """
+        Check each unique link once, concurrently, and return the failed result
+        rows in first-seen order so reports are deterministic between runs.
+        `links` is either {url: [locations]} from collect_links() or plain hrefs.
+        """
+        if not isinstance(links, Mapping):
+            links = collect_links(((href, None) for href in links), self.strip_tracking)
+        items = list(links.items())
+        rows = [None] * len(items)
+
+        # Spread the workers across hosts, then put the rows back in first-seen order
+        pending = interleave_by_host(items, key=lambda item: item[0])
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            checked = executor.map(lambda entry: (entry[0], self._checkpointed_verdict(entry[1][0])), pending)
+            for index, row in tqdm(checked, total=len(pending), desc="Checking URLs", unit="URL"):
+                rows[index] = with_locations(row, items[index][1]) if row else None
+        logging.info(f"Link check stats: {self.stats}")
+        return [row for row in rows if row]
+
+    def check_stream(self, entries, queue_size=None):
+        """
+        Check links as they are extracted, in constant memory: (href, location)
+        `entries` (any iterable, e.g. iter_link_entries()) are normalized and
+        de-duplicated, then handed to the workers through a bounded queue, so
+        extraction pauses while the workers are behind. De-duplication keeps
+        64-bit fingerprints in a FingerprintSet, and locations are only kept for
+        links that are in flight or failed. Returns the failed rows in
+        first-seen order.
+        """
+        work = queue.Queue(maxsize=queue_size or self.max_workers * 4)
+        seen = FingerprintSet()
+        in_flight = {}   # url -> (first-seen order, locations) while being checked
+        failures = {}    # url -> (first-seen order, row, locations)
+        lock = threading.Lock()
+        progress = tqdm(desc="Checking URLs", unit="URL")
+
+        def work_loop():
+            while True:
+                url = work.get()
+                if url is None:
+                    return
+                row = None
+                try:
+                    row = self._checkpointed_verdict(url)
+                except CheckStopped:
+                    return
+                finally:
+                    # Cleared even if the check raised, so a dead worker leaves nothing in flight
+                    with lock:
+                        order, locations = in_flight.pop(url)
+                        if row:
+                            failures[url] = (order, row, locations)
+                    progress.update(1)
+
+        workers = [threading.Thread(target=work_loop, name=f"links-{i}", daemon=True)
+                   for i in range(self.max_workers)]
+        for worker in workers:
+            worker.start()
+        order = found = 0
+        try:
+            for href, location in entries:
+                self.check_stop()
+                found += 1
+                url = normalize_url(href, self.strip_tracking)
+                if url is None:
+                    continue
+                if not seen.add(url):
+                    # A repeat: only its location matters, and only if the link is pending or failed
+                    if location:
+                        with lock:
+                            entry = in_flight.get(url) or failures.get(url)
+                            if entry and location not in entry[-1]:
+                                entry[-1].append(location)
+                    continue
+                with lock:
+                    in_flight[url] = (order, [location] if location else [])
+                order += 1
+                if not hand_off(work, url, workers):
+                    raise RuntimeError("All link-check workers stopped")
+        finally:
+            for _ in workers:
+                hand_off(work, None, workers)
+            for worker in workers:
+                worker.join()
+            progress.close()
+            seen.close()
+        # Links skipped by stopped workers would otherwise look like passes
+        self.check_stop()
+        self.stats['links_found'], self.stats['unique_links'] = found, order
+        logging.info(f"Link check stats: {self.stats}")
+        return [with_locations(row, locations)
+                for _, row, locations in sorted(failures.values(), key=lambda failure: failure[0])]
+
+    def close(self):
+        """
+        Close the HTTP session.
+        """
+        self.session.close()
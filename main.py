@@ -1,35 +1,375 @@
 # main.py
+import os
+import sys
+import logging
+import argparse
+import multiprocessing
+from functools import partial
+from collections import Counter
 from currency_check import CurrencySelectionBot  # Adjust the import path accordingly
 from check_urls import run_tests_url
-from upto_alt import run_tests
+from upto_alt import run_tests, run_image_audit
 from scraped_data import ScrapeData
+from link_cache import DEFAULT_TTL
+from response_cache import ResponseCache, DEFAULT_MAX_MB, DEFAULT_TTL as DEFAULT_HTTP_TTL
+from driver_pool import DriverPool
+from report_sink import ReportSink, REPORT_FILE
+from results_store import ResultsStore
+from delta_report import compute_delta, print_delta
+from currency_api import CurrencyApiVerifier, DEFAULT_TOLERANCE
+from crawler import run_crawl, DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES, DEFAULT_CRAWL_WORKERS, ENGINES
+from browser_profile import LEAN_PROFILE, FULL_PROFILE, IMAGE_PROFILE
+from image_audit import DEFAULT_MAX_IMAGE_KB
+from host_limiter import HostLimiter, DEFAULT_HOST_CONCURRENCY, DEFAULT_HOST_RATE
+from link_checker import DEFAULT_MAX_RETRIES
+from orchestrator import Suite, SuiteOrchestrator, DEFAULT_SUITE_TIMEOUT
+import instrumentation
+from checkpoint import Checkpoint
+from sharding import (ShardSink, SHARD_DIR, read_manifest, select_shard, parse_shard, shard_path,
+                      outcome_record, record_crash, finished_shard, shard_passed, combine_parts,
+                      publish_shards)
 
 
-def main():
-    # Run all tests in sequence
-    # URL of the page you want to test
-    currency_url = "https://www.alojamiento.io/property/cabrils/BC-1178728"
-    url = "https://www.alojamiento.io/"
-
-    # 1
-    run_tests(url)
-    # 2
-    run_tests_url(url)
-    # 3
-    # Create an instance of CurrencySelectionBot
-    bot = CurrencySelectionBot(currency_url)
-    # Run the test
-    if bot.run_currency_selection_test():
-        print("✅ Currency Selection Test Completed Successfully!")
-        # Generate the Excel report
-        bot.generate_excel_report()
+# One browser per suite, so the suites never wait on each other
+DEFAULT_BROWSERS = 5
+SUITE_NAMES = ('seo', 'links', 'currency', 'script_data', 'images')
+# URLs of the pages you want to test
+HOME_URL = "https://www.alojamiento.io/"
+PROPERTY_URL = "https://www.alojamiento.io/property/cabrils/BC-1178728"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the vacation rental page test suites.")
+    parser.add_argument('--force-recheck', action='store_true',
+                        help="Ignore the link status cache and re-check every link")
+    parser.add_argument('--no-link-cache', action='store_true',
+                        help="Do not read or write the link status cache")
+    parser.add_argument('--cache-ttl', type=int, default=DEFAULT_TTL,
+                        help="Seconds before a cached link status is revalidated (default: %(default)s)")
+    parser.add_argument('--no-http-cache', action='store_true',
+                        help="Do not read or write the HTTP response cache")
+    parser.add_argument('--http-cache-size', type=int, default=DEFAULT_MAX_MB, metavar='MB',
+                        help="Size cap of the HTTP response cache; least recently used responses are "
+                             "evicted beyond it (default: %(default)s)")
+    parser.add_argument('--http-cache-ttl', type=int, default=DEFAULT_HTTP_TTL,
+                        help="Seconds before a cached response is revalidated (default: %(default)s)")
+    parser.add_argument('--host-concurrency', type=int, default=DEFAULT_HOST_CONCURRENCY,
+                        help="Link and image requests in flight per host (default: %(default)s)")
+    parser.add_argument('--host-rate', type=float, default=DEFAULT_HOST_RATE,
+                        help="Link and image requests started per second per host (default: %(default)s)")
+    parser.add_argument('--max-retries', type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Retries for 429/503 responses and connection errors (default: %(default)s)")
+    parser.add_argument('--browsers', type=int, default=DEFAULT_BROWSERS,
+                        help="Maximum browser sessions open at once, shared by the suites (default: %(default)s)")
+    parser.add_argument('--suite-timeout', type=int, default=DEFAULT_SUITE_TIMEOUT,
+                        help="Seconds before a suite is stopped and marked as timed out (default: %(default)s)")
+    parser.add_argument('--sequential', action='store_true',
+                        help="Run the suites one after another instead of concurrently")
+    parser.add_argument('--currency-workers', type=int, default=1,
+                        help="Browsers that check currency options in parallel (default: %(default)s)")
+    parser.add_argument('--currency-mode', choices=('ui', 'api'), default='ui',
+                        help="'ui' clicks every currency; 'api' replays the page's pricing request for "
+                             "every currency and checks the conversions agree (default: %(default)s)")
+    parser.add_argument('--currency-tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed spread between implied exchange rates in api mode (default: %(default)s)")
+    parser.add_argument('--image-max-kb', type=int, default=DEFAULT_MAX_IMAGE_KB,
+                        help="Images larger than this many KB fail the image weight check (default: %(default)s)")
+    parser.add_argument('--headed', action='store_true',
+                        help="Show the browser windows instead of running headless")
+    parser.add_argument('--full-browser', action='append', choices=SUITE_NAMES, default=[], metavar='SUITE',
+                        help="Let this suite's browsers load images, media, fonts and analytics "
+                             "(can be repeated; choices: %(choices)s)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue an interrupted run, skipping links, pages and currencies it already finished")
+    parser.add_argument('--trace', nargs='?', const=instrumentation.TRACE_FILE, metavar='FILE',
+                        help="Time every step, print a summary and write a Chrome trace "
+                             "(default file: %(const)s)")
+    parser.add_argument('--no-excel', action='store_true',
+                        help="Only record results in the results store; export Excel later with results_store.py")
+    crawl = parser.add_argument_group("crawl mode")
+    crawl.add_argument('--crawl', metavar='SEED_URL',
+                       help="Discover property pages from this URL and run the SEO checks on each")
+    crawl.add_argument('--sitemap', metavar='SITEMAP_URL',
+                       help="Read property pages from a sitemap instead of crawling")
+    crawl.add_argument('--max-depth', type=int, default=DEFAULT_MAX_DEPTH,
+                       help="Link hops to follow from the seed URL (default: %(default)s)")
+    crawl.add_argument('--max-pages', type=int, default=DEFAULT_MAX_PAGES,
+                       help="Maximum number of property pages to test (default: %(default)s)")
+    crawl.add_argument('--workers', type=int, default=DEFAULT_CRAWL_WORKERS,
+                       help="Parallel browser workers for the crawl (default: %(default)s)")
+    crawl.add_argument('--crawl-links', action='store_true',
+                       help="Also check the links on every crawled page")
+    crawl.add_argument('--engine', choices=ENGINES, default='selenium',
+                       help="'static' checks plain HTML and only renders pages that need JavaScript "
+                            "(default: %(default)s)")
+    shards = parser.add_argument_group("sharded mode")
+    shards.add_argument('--manifest', metavar='FILE',
+                        help="Pages to test, one URL per line, optionally followed by comma-separated suites "
+                             "(default: the built-in pages)")
+    shards.add_argument('--shard', type=parse_shard, default=(1, 1), metavar='INDEX/COUNT',
+                        help="Only run this slice of the manifest, e.g. 3/8 on the third of eight machines; "
+                             "merge the slices afterwards with sharding.py merge")
+    shards.add_argument('--processes', type=int, default=1,
+                        help="Worker processes, each with its own browsers, that split this machine's slice "
+                             "(default: %(default)s)")
+    shards.add_argument('--shard-dir', default=SHARD_DIR,
+                        help="Where shard results are written (default: %(default)s)")
+    args = parser.parse_args(argv)
+    if (args.crawl or args.sitemap) and is_sharded(args):
+        parser.error("crawl mode cannot be combined with --manifest, --shard or --processes")
+    return args
+
+
+def default_manifest():
+    # The currency footer and the listing photos are checked on a property page, the rest on the home page
+    return [('seo', HOME_URL), ('links', HOME_URL), ('currency', PROPERTY_URL), ('script_data', HOME_URL),
+            ('images', PROPERTY_URL)]
+
+
+def is_sharded(args):
+    return bool(args.manifest) or args.shard[1] > 1 or args.processes > 1
+
+
+def finish_trace(args, label=None):
+    if args.trace:
+        instrumentation.print_summary()
+        path = args.trace
+        if label:
+            # One trace per worker process
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{label}{ext}"
+        instrumentation.export_chrome_trace(path)
+
+
+def finish_checkpoint(checkpoint, completed):
+    if completed:
+        checkpoint.finish()
+    else:
+        checkpoint.close()
+        print("↩️ Run did not complete; rerun with --resume to continue where it stopped")
+
+
+def open_response_cache(args):
+    # --force-recheck still refreshes the cache, it just never answers from it
+    if args.no_http_cache:
+        return None
+    return ResponseCache(max_bytes=args.http_cache_size * 2 ** 20, ttl=args.http_cache_ttl,
+                         refresh=args.force_recheck)
+
+
+def close_response_cache(response_cache):
+    if response_cache is not None:
+        response_cache.print_stats()
+        response_cache.close()
+
+
+def browser_profile(args):
+    # Headless and without images, media, fonts or trackers unless asked otherwise
+    return LEAN_PROFILE.replace(headless=not args.headed)
+
+
+def currency_browsers(args):
+    return args.currency_workers if args.currency_mode == 'ui' else 1
+
+
+def suite_pool(args, profile):
+    # Every suite borrows its browser from one pool, so Chrome is started at most --browsers times
+    browsers = 1 if args.sequential else args.browsers
+    return DriverPool(size=max(browsers, currency_browsers(args)), profile=profile)
+
+
+def build_suites(items, args, sink, checkpoint, limiter, response_cache=None):
+    """
+    One Suite per (suite name, page URL) manifest item. Suites are named
+    after the suite alone unless the same suite runs on several pages.
+    """
+    def seo_suite(url, suite_pool):
+        return run_tests(url, pool=suite_pool, sink=sink)
+
+    def links_suite(url, suite_pool):
+        return run_tests_url(url, use_cache=not args.no_link_cache, cache_ttl=args.cache_ttl,
+                             force_recheck=args.force_recheck, pool=suite_pool, sink=sink,
+                             limiter=limiter, max_retries=args.max_retries, checkpoint=checkpoint,
+                             response_cache=response_cache, stop=suite_pool.stopped)
+
+    def currency_suite(url, suite_pool):
+        if args.currency_mode == 'api':
+            bot = CurrencyApiVerifier(url, pool=suite_pool, tolerance=args.currency_tolerance, sink=sink,
+                                      stop=suite_pool.stopped)
+            passed = bot.run_currency_api_test()
+        else:
+            bot = CurrencySelectionBot(url, pool=suite_pool, workers=args.currency_workers, sink=sink,
+                                       checkpoint=checkpoint)
+            passed = bot.run_currency_selection_test()
+        if passed:
+            print("✅ Currency Selection Test Completed Successfully!")
+            # Generate the Excel report
+            bot.generate_excel_report()
+        else:
+            print("❌ Currency Selection Test Failed")
+        return passed
+
+    def script_data_suite(url, suite_pool):
+        scraper = ScrapeData(url, pool=suite_pool, sink=sink)
+        try:
+            return scraper.scrape_data()
+        finally:
+            scraper.close()
+
+    def images_suite(url, suite_pool):
+        return run_image_audit(url, pool=suite_pool, sink=sink, max_bytes=args.image_max_kb * 1024,
+                               response_cache=response_cache, limiter=limiter, stop=suite_pool.stopped)
+
+    runners = {'seo': seo_suite, 'links': links_suite, 'currency': currency_suite,
+               'script_data': script_data_suite, 'images': images_suite}
+    browsers = {'currency': currency_browsers(args)}
+    # The image audit needs images loaded to know their natural sizes
+    profiles = {'images': IMAGE_PROFILE}
+    pages_per_suite = Counter(name for name, _ in items)
+    suites = []
+    for name, url in items:
+        suites.append(Suite(name if pages_per_suite[name] == 1 else f"{name} {url}", partial(runners[name], url),
+                            browsers=browsers.get(name, 1), timeout=args.suite_timeout,
+                            profile=FULL_PROFILE if name in args.full_browser else profiles.get(name)))
+    return suites
+
+
+def run_suites(items, args, pool, sink, checkpoint, limiter, response_cache=None):
+    # The suites are independent; they share the pool, the sink and the store
+    suites = build_suites(items, args, sink, checkpoint, limiter, response_cache)
+    return SuiteOrchestrator(pool, browser_limit=pool.size if not args.sequential else 1).run(suites)
+
+
+def run_shard(items, args, label, output, processes=1):
+    """
+    Run the manifest `items` in this process, with its own browsers, and
+    write their rows and outcomes to the shard file `output`. Per-host limits
+    are divided between the `processes` running side by side.
+    Returns True if every suite passed.
+    """
+    if args.trace:
+        instrumentation.enable()
+    sink = ShardSink(output)
+    pool = suite_pool(args, browser_profile(args))
+    checkpoint = Checkpoint(f"main-{label}", resume=args.resume)
+    limiter = HostLimiter(max(1, args.host_concurrency // processes), args.host_rate / processes)
+    response_cache = open_response_cache(args)
+    completed = False
+    try:
+        outcomes = run_suites(items, args, pool, sink, checkpoint, limiter, response_cache)
+        sink.add_outcomes([outcome_record(outcome) for outcome in outcomes])
+        completed = all(outcome.status == 'passed' for outcome in outcomes)
+    finally:
+        finish_checkpoint(checkpoint, completed)
+        pool.close_all()
+        sink.close()
+        close_response_cache(response_cache)
+        finish_trace(args, label)
+    return completed
+
+
+def shard_worker(items, args, label, output, processes):
+    # Entry point of a worker process; the exit code tells whether every suite passed
+    sys.exit(0 if run_shard(items, args, label, output, processes) else 1)
+
+
+def run_sharded(args):
+    """
+    Run this machine's slice (--shard) of the manifest in --processes worker
+    processes. With a single shard the results are merged into the report
+    and the results store right away; otherwise the slice is left in
+    --shard-dir for sharding.py merge.
+    """
+    items = read_manifest(args.manifest, SUITE_NAMES) if args.manifest else default_manifest()
+    index, count = args.shard
+    mine = select_shard(items, index, count)
+    processes = max(1, min(args.processes, len(mine)))
+    print(f"🧩 Shard {index}/{count}: {len(mine)} of {len(items)} items in {processes} process(es)")
+    output = shard_path(args.shard_dir, index, count)
+    parts = [(select_shard(mine, part, processes), f"{output}.part-{part}",
+              f"shard-{index}-of-{count}-part-{part}-of-{processes}") for part in range(1, processes + 1)]
+
+    if processes == 1:
+        run_shard(mine, args, parts[0][2], parts[0][1])
     else:
-        print("❌ Currency Selection Test Failed")
-    # 4
-    scraper = ScrapeData(url)
-    scraper.scrape_data()
-    scraper.close()
+        # Fresh interpreters, so no worker inherits another's browsers or locks; one dying leaves the rest running
+        context = multiprocessing.get_context('spawn')
+        workers = [(context.Process(target=shard_worker, args=(part_items, args, label, path, processes), name=label),
+                    part_items, path) for part_items, path, label in parts]
+        for worker, _, _ in workers:
+            worker.start()
+        for worker, part_items, path in workers:
+            worker.join()
+            if not finished_shard(path):
+                logging.error(f"Worker {worker.name} exited with code {worker.exitcode} before finishing")
+                record_crash(path, part_items, f"worker exited with code {worker.exitcode}")
+    combine_parts([path for _, path, _ in parts], output)
+
+    if count > 1:
+        print(f"✅ Shard {index}/{count} written to {output}; "
+              f"once every shard is collected run: python sharding.py merge {args.shard_dir}")
+        return shard_passed(output)
+    passed = publish_shards([output], report_file=None if args.no_excel else REPORT_FILE, label='main')
+    os.remove(output)
+    return passed
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace:
+        instrumentation.enable()
+    if is_sharded(args):
+        return run_sharded(args)
+
+    # All suites stream into the results store and one report, written once at the end
+    store = ResultsStore()
+    run_id = store.start_run(label='crawl' if args.crawl or args.sitemap else 'main')
+    sink = ReportSink(report_file=None if args.no_excel else REPORT_FILE, store=store, run_id=run_id)
+    profile = browser_profile(args)
+    # Responses fetched over plain HTTP are reused within the run and by the next one
+    response_cache = open_response_cache(args)
+    if args.crawl or args.sitemap:
+        pool = DriverPool(size=args.workers, profile=profile)
+        checkpoint = Checkpoint('crawl', resume=args.resume)
+        completed = False
+        try:
+            run_crawl(seed_url=args.crawl, sitemap_url=args.sitemap, max_depth=args.max_depth,
+                      max_pages=args.max_pages, workers=args.workers, check_links=args.crawl_links,
+                      pool=pool, engine=args.engine, sink=sink,
+                      limiter=HostLimiter(args.host_concurrency, args.host_rate), checkpoint=checkpoint,
+                      response_cache=response_cache, use_cache=not args.no_link_cache,
+                      cache_ttl=args.cache_ttl, force_recheck=args.force_recheck)
+            completed = True
+        finally:
+            finish_checkpoint(checkpoint, completed)
+            pool.close_all()
+            sink.close()
+            store.close()
+            close_response_cache(response_cache)
+            finish_trace(args)
+        return completed
+
+    pool = suite_pool(args, profile)
+    # Finished links and currencies are journaled, so --resume can pick up after a crash
+    checkpoint = Checkpoint('main', resume=args.resume)
+    completed = False
+    try:
+        outcomes = run_suites(default_manifest(), args, pool, sink, checkpoint,
+                              HostLimiter(args.host_concurrency, args.host_rate), response_cache)
+        completed = all(outcome.status == 'passed' for outcome in outcomes)
+        # Only what changed since the previous run, for triage
+        delta = compute_delta(store, run_id)
+        sink.add_rows('Delta', delta)
+        print_delta(delta)
+    finally:
+        finish_checkpoint(checkpoint, completed)
+        pool.close_all()
+        sink.close()
+        store.close()
+        close_response_cache(response_cache)
+        finish_trace(args)
+    return completed
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,171 @@
+# orchestrator.py
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from instrumentation import span
+
+
+DEFAULT_SUITE_TIMEOUT = 900  # seconds
+
+
+class Suite:
+    def __init__(self, name, run, browsers=1, timeout=DEFAULT_SUITE_TIMEOUT, profile=None):
+        """
+        One independent test suite. `run(pool)` is a blocking callable that gets
+        a ScopedPool to borrow browsers from; HTTP work should stop once
+        `pool.stopped` is set. `browsers` is how many browsers it uses at once
+        (0 for HTTP-only suites). A return value of False marks it failed.
+        `profile` overrides the pool's BrowserProfile for this suite's browsers.
+        """
+        self.name = name
+        self.run = run
+        self.browsers = browsers
+        self.timeout = timeout
+        self.profile = profile
+
+
+class SuiteOutcome:
+    def __init__(self, name):
+        self.name = name
+        self.status = 'pending'
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.waited = 0.0
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+class BrowserSlots:
+    """
+    Global browser budget shared by all suites. A suite takes all the slots
+    it needs at once, so two suites can never each hold half of what they need.
+    """
+    def __init__(self, limit):
+        self.limit = max(1, int(limit))
+        self.free = self.limit
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, count):
+        count = min(count, self.limit)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.free >= count)
+            self.free -= count
+        return count
+
+    async def release(self, count):
+        async with self._condition:
+            self.free += count
+            self._condition.notify_all()
+
+
+class SuiteOrchestrator:
+    def __init__(self, pool, browser_limit=None):
+        """
+        Run suites concurrently on worker threads while never using more than
+        `browser_limit` browsers (the pool size by default). Each suite has its
+        own timeout; a failing, timed-out or cancelled suite does not affect the
+        others, and its browsers are killed and its scope stopped so its thread
+        unwinds. run() only returns once every suite thread has ended.
+        """
+        self.pool = pool
+        self.browser_limit = browser_limit or pool.size
+        self.outcomes = {}
+        self._loop = None
+        self._task = None
+
+    async def _run_suite(self, suite, slots, executor):
+        outcome = self.outcomes[suite.name]
+        queued = time.monotonic()
+        taken = await slots.acquire(suite.browsers) if suite.browsers else 0
+        scope = self.pool.scoped(suite.profile)
+        outcome.started = time.monotonic()
+        outcome.waited = outcome.started - queued
+        outcome.status = 'running'
+        logging.info(f"Suite {suite.name} started after waiting {outcome.waited:.1f}s for browsers")
+        future = self._loop.run_in_executor(executor, run_in_span, suite, scope)
+        try:
+            result = await asyncio.wait_for(future, suite.timeout)
+            outcome.status = 'failed' if result is False else 'passed'
+        except asyncio.TimeoutError:
+            outcome.status = 'timed out'
+            outcome.error = f"No result after {suite.timeout}s"
+            scope.abort()
+        except asyncio.CancelledError:
+            outcome.status = 'cancelled'
+            scope.abort()
+            raise
+        except Exception as e:
+            outcome.status = 'failed'
+            outcome.error = str(e)
+            logging.exception(f"Suite {suite.name} failed")
+        finally:
+            outcome.finished = time.monotonic()
+            if taken:
+                await slots.release(taken)
+            print(f"{'✅' if outcome.status == 'passed' else '❌'} Suite {suite.name} {outcome.status} "
+                  f"in {outcome.duration:.1f}s")
+        return outcome
+
+    async def run_async(self, suites):
+        self._loop = asyncio.get_running_loop()
+        self._task = asyncio.current_task()
+        self.outcomes = {suite.name: SuiteOutcome(suite.name) for suite in suites}
+        slots = BrowserSlots(self.browser_limit)
+        executor = ThreadPoolExecutor(max_workers=max(1, len(suites)), thread_name_prefix='suite')
+        try:
+            await asyncio.gather(*(self._run_suite(suite, slots, executor) for suite in suites),
+                                 return_exceptions=True)
+        finally:
+            # Timed-out or cancelled suites may still be unwinding and using the shared sink and pool
+            unwinding = [outcome.name for outcome in self.outcomes.values()
+                         if outcome.status in ('timed out', 'cancelled')]
+            if unwinding:
+                print(f"⏳ Waiting for {', '.join(unwinding)} to stop")
+            executor.shutdown(wait=True)
+        return list(self.outcomes.values())
+
+    def run(self, suites):
+        """
+        Run `suites` to completion and return their outcomes in the given order.
+        Ctrl+C (or cancel()) stops the remaining suites.
+        """
+        started = time.monotonic()
+        try:
+            outcomes = asyncio.run(self.run_async(suites))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print("❌ Suites cancelled")
+            outcomes = list(self.outcomes.values())
+            for outcome in outcomes:
+                if outcome.status in ('pending', 'running'):
+                    outcome.status = 'cancelled'
+        print_timings(outcomes, time.monotonic() - started)
+        return outcomes
+
+    def cancel(self):
+        """
+        Cancel all running suites; safe to call from any thread.
+        """
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+
+
+def run_in_span(suite, scope):
+    with span(f"suite.{suite.name}", 'suite'):
+        return suite.run(scope)
+
+
+def print_timings(outcomes, elapsed):
+    print("⏱️ Suite timings:")
+    for outcome in outcomes:
+        detail = f" ({outcome.error})" if outcome.error else ""
+        print(f"   {outcome.name:<12} {outcome.status:<10} {outcome.duration:7.1f}s"
+              f"  waited {outcome.waited:5.1f}s{detail}")
+    slowest = max((outcome.duration for outcome in outcomes), default=0.0)
+    total = sum(outcome.duration for outcome in outcomes)
+    print(f"   wall time {elapsed:.1f}s (slowest suite {slowest:.1f}s, sum of suites {total:.1f}s)")
@@ -0,0 +1,184 @@
+# report_sink.py
+import os
+import json
+import logging
+import tempfile
+import threading
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+from instrumentation import span, count
+
+
+REPORT_FILE = 'reports/all_the_reports.xlsx'
+
+# Sheet name -> (column headers, result keys), in the order sheets are written
+SHEETS = {
+    'Test': (['Page URL', 'Test Case', 'Status', 'Comments'],
+             ['page_url', 'testcase', 'status', 'comments']),
+    'Currency': (['Page URL', 'Currency', 'Status', 'Comments'],
+                 ['url', 'currency', 'status', 'comments']),
+    'Script Data': (['SiteURL', 'SiteName', 'Browser', 'CountryCode', 'IP', 'CampaignID'],
+                    ['SiteURL', 'SiteName', 'Browser', 'CountryCode', 'IP', 'CampaignID']),
+    'Delta': (['Change', 'Suite', 'Page URL', 'Test Case', 'Comments'],
+              ['change', 'suite', 'page_url', 'testcase', 'comments']),
+}
+# Sheets computed from the results store itself, so never recorded back into it
+DERIVED_SHEETS = {'Delta'}
+COLUMN_WIDTH = 30
+
+
+class ReportSink:
+    def __init__(self, report_file=REPORT_FILE, keep_existing=False, store=None, run_id=None, append=False):
+        """
+        Shared report writer for every suite. Rows are spooled to temporary
+        files as they arrive and the workbook is written once, in openpyxl's
+        write-only mode, by close(). With `keep_existing`, sheets already in the
+        report that received no rows this time are carried over; with `append`
+        as well, sheets that did receive rows keep their existing rows too.
+        When a ResultsStore `store` is given, rows are also appended to it under
+        `run_id`; with `report_file=None` they go to the store only.
+        """
+        self.report_file = report_file
+        self.keep_existing = keep_existing
+        self.append = append
+        self.store = store
+        self.run_id = run_id
+        self._spools = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def add_row(self, sheet, row, suite=None):
+        self.add_rows(sheet, [row], suite)
+
+    def add_rows(self, sheet, rows, suite=None):
+        """
+        Append result dicts to `sheet` (one of SHEETS). `suite` names the
+        producer in the results store and defaults to the sheet name.
+        """
+        _, keys = SHEETS[sheet]
+        rows = list(rows)
+        count(f"report.rows.{sheet}", len(rows))
+        if self.store is not None and sheet not in DERIVED_SHEETS:
+            self.store.append(self.run_id, suite or sheet, sheet, rows)
+        if self.report_file is None:
+            return
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Report sink is closed")
+            spool = self._spools.get(sheet)
+            if spool is None:
+                spool = self._spools[sheet] = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+                self._counts[sheet] = 0
+            for row in rows:
+                spool.write(json.dumps([row.get(key, '') for key in keys], default=str) + '\n')
+                self._counts[sheet] += 1
+
+    def row_count(self, sheet):
+        return self._counts.get(sheet, 0)
+
+    def _header_cells(self, worksheet, headers):
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(worksheet, value=header)
+            cell.font = Font(bold=True)
+            cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+            cells.append(cell)
+        return cells
+
+    def _existing_sheets(self):
+        # Current report opened read-only, so untouched sheets can be copied over
+        if not (self.keep_existing and os.path.exists(self.report_file)):
+            return None
+        try:
+            existing = openpyxl.load_workbook(self.report_file, read_only=True)
+        except Exception as e:
+            logging.warning(f"Could not read existing report {self.report_file}: {e}")
+            return None
+        return existing
+
+    def close(self):
+        """
+        Write the workbook (if any rows were added) and discard the spool files.
+        """
+        with self._lock:
+            if self._closed:
+                return self.report_file
+            self._closed = True
+        if not self._spools:
+            return None
+
+        with span('report.write', 'io'):
+            return self._write()
+
+    def _write(self):
+        try:
+            directory = os.path.dirname(self.report_file) or '.'
+            os.makedirs(directory, exist_ok=True)
+            existing = self._existing_sheets()
+            workbook = openpyxl.Workbook(write_only=True)
+
+            # Keep the existing sheet order; sheets new to the report go at the end
+            names = list(existing.sheetnames) if existing is not None else []
+            names += [sheet for sheet in SHEETS if sheet in self._spools and sheet not in names]
+
+            for name in names:
+                spool = self._spools.get(name)
+                worksheet = workbook.create_sheet(title=name)
+                if spool is None:
+                    for values in existing[name].iter_rows(values_only=True):
+                        worksheet.append(values)
+                    continue
+                headers, _ = SHEETS[name]
+                for col in range(1, len(headers) + 1):
+                    worksheet.column_dimensions[get_column_letter(col)].width = COLUMN_WIDTH
+                worksheet.append(self._header_cells(worksheet, headers))
+                if self.append and existing is not None and name in existing.sheetnames:
+                    # Everything below the existing header row
+                    for values in existing[name].iter_rows(min_row=2, values_only=True):
+                        worksheet.append(values)
+                spool.seek(0)
+                for line in spool:
+                    worksheet.append(json.loads(line))
+            if existing is not None:
+                existing.close()
+
+            # Write next to the report and swap it in, so a failed save keeps the old file
+            handle, temp_file = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+            os.close(handle)
+            try:
+                workbook.save(temp_file)
+                os.replace(temp_file, self.report_file)
+            finally:
+                if os.path.exists(temp_file):
+                    os.remove(temp_file)
+            counts = ', '.join(f"{sheet}: {count}" for sheet, count in self._counts.items())
+            logging.info(f"Report written to {self.report_file} ({counts})")
+            print(f"✅ Excel Report generated: {self.report_file}")
+            return self.report_file
+        finally:
+            for spool in self._spools.values():
+                spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_results(sheet, rows, sink=None, suite=None):
+    """
+    Send rows to `sink`, or to a one-off sink that adds them to the report
+    right away, below the rows already in the sheet. Returns the report path
+    (None if the rows were only queued on a shared sink).
+    """
+    if sink is not None:
+        sink.add_rows(sheet, rows, suite)
+        return None
+    one_off = ReportSink(keep_existing=True, append=True)
+    one_off.add_rows(sheet, rows, suite)
+    return one_off.close()
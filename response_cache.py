@@ -0,0 +1,276 @@
+# response_cache.py
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import logging
+import threading
+from http.client import responses as REASONS
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from instrumentation import count
+
+
+DEFAULT_CACHE_PATH = '.cache/http_responses.sqlite'
+DEFAULT_MAX_MB = 256
+DEFAULT_TTL = 60 * 60  # one hour, in seconds
+MAX_ENTRY_BYTES = 8 * 2 ** 20  # bodies larger than this are never stored
+CACHED_METHODS = {'GET', 'HEAD'}
+# Request headers that change what the server sends back, so they are part of the key
+KEY_HEADERS = ('Accept', 'Accept-Language', 'Range', 'Cookie', 'Authorization')
+# Headers about the transfer rather than the content (bodies are stored decoded) or about the visitor
+DROPPED_HEADERS = {'content-encoding', 'transfer-encoding', 'connection', 'keep-alive', 'set-cookie'}
+# 304s only mean something to the request that sent validators; 429 and 5xx are transient
+UNSTORED_STATUSES = {304, 429}
+
+
+def cache_key(method, url, headers):
+    """
+    Cache key of a request: method, URL without fragment and the KEY_HEADERS it sends.
+    """
+    parts = [method.upper(), url.split('#', 1)[0]]
+    parts += [f"{name}: {headers.get(name, '')}" for name in KEY_HEADERS]
+    return hashlib.blake2b('\n'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def is_storable(status):
+    return status < 500 and status not in UNSTORED_STATUSES
+
+
+class ResponseCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_MB * 2 ** 20, ttl=DEFAULT_TTL,
+                 refresh=False):
+        """
+        Open (or create) the on-disk HTTP response cache shared by the
+        HTTP-based checks. Bodies are stored zlib-compressed; when the stored
+        total passes `max_bytes` the least recently used entries are evicted.
+        Entries are served as-is for `ttl` seconds and revalidated with
+        ETag / Last-Modified after that. This caches test runs, not browsing:
+        Cache-Control on the responses is not consulted.
+        With `refresh`, lookups always miss but responses are still stored.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.refresh = refresh
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+        self._lock = threading.Lock()
+        # Sharded runs open the cache from several processes at once
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " url TEXT NOT NULL,"
+            " status INTEGER NOT NULL,"
+            " headers TEXT NOT NULL,"
+            " body BLOB NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " stored_at REAL NOT NULL,"
+            " used_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at);"
+        )
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        logging.info(f"Opened HTTP response cache: {path} ({self._total / 2 ** 20:.1f} MB)")
+        if self._total > self.max_bytes:
+            # The cap was lowered since the last run
+            self._evict()
+
+    def record(self, name):
+        with self._lock:
+            self.stats[name] += 1
+        count(f"http_cache.{name}")
+
+    def get(self, key):
+        """
+        Return the entry stored under `key` as a dict, or None. Marks it as recently used.
+        """
+        if self.refresh:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, headers, body, stored_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET used_at = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        return {'key': key, 'status': row[0], 'headers': json.loads(row[1]), 'body': zlib.decompress(row[2]),
+                'stored_at': row[3]}
+
+    def is_fresh(self, entry):
+        return entry is not None and time.time() - entry['stored_at'] < self.ttl
+
+    def put(self, key, url, status, headers, body):
+        """
+        Store a response under `key` and evict old entries if over the size cap.
+        """
+        headers = json.dumps({name: value for name, value in headers.items()
+                              if name.lower() not in DROPPED_HEADERS})
+        body = zlib.compress(body)
+        size = len(body) + len(headers)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, size, stored_at, used_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, status, headers, body, size, now, now)
+            )
+            self._conn.commit()
+            self._total += size - (previous[0] if previous else 0)
+            over = self._total > self.max_bytes
+        self.record('stored')
+        if over:
+            self._evict()
+
+    def touch(self, key):
+        """
+        Mark an entry as fresh again without changing it (after a 304).
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("UPDATE responses SET stored_at = ?, used_at = ? WHERE key = ?", (now, now, key))
+            self._conn.commit()
+
+    def _evict(self):
+        # Drop least recently used entries until the cache is 10% under its cap
+        target = self.max_bytes * 0.9
+        with self._lock:
+            # Other processes may have added entries too
+            self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            doomed = []
+            for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY used_at"):
+                if self._total <= target:
+                    break
+                doomed.append((key,))
+                self._total -= size
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self._conn.commit()
+            evicted = len(doomed)
+            self.stats['evicted'] += evicted
+        count('http_cache.evicted', evicted)
+        logging.info(f"Evicted {evicted} responses from the HTTP cache")
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['revalidated'] + self.stats['misses']
+        return (self.stats['hits'] + self.stats['revalidated']) / lookups if lookups else 0.0
+
+    def print_stats(self):
+        stats = self.stats
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses']
+        if not lookups:
+            return
+        print(f"🗄️ HTTP cache: {lookups} requests, {self.hit_rate():.0%} served locally "
+              f"({stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} misses), "
+              f"{stats['evicted']} evicted, {self._total / 2 ** 20:.1f} of {self.max_bytes / 2 ** 20:.1f} MB used")
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def cached_response(request, entry):
+    """
+    Build a requests Response for `request` from a cache entry.
+    """
+    response = Response()
+    response.status_code = entry['status']
+    response.reason = REASONS.get(entry['status'], '')
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = b'' if request.method == 'HEAD' else entry['body']
+    response._content_consumed = True
+    response.url = request.url
+    response.request = request
+    response.connection = None
+    return response
+
+
+class CachingAdapter(HTTPAdapter):
+    def __init__(self, cache, **kwargs):
+        """
+        Transport adapter that answers GET and HEAD requests from `cache`
+        (a ResponseCache) and stores what it had to fetch. A HEAD can also be
+        answered from a stored GET of the same URL. Requests sent with
+        Cache-Control: no-cache always go to the network.
+        """
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def lookup(self, request):
+        keys = [cache_key(request.method, request.url, request.headers)]
+        if request.method == 'HEAD':
+            keys.append(cache_key('GET', request.url, request.headers))
+        for key in keys:
+            entry = self.cache.get(key)
+            if entry is not None:
+                return entry
+        return None
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method not in CACHED_METHODS or 'no-cache' in request.headers.get('Cache-Control', ''):
+            return super().send(request, stream=stream, **kwargs)
+
+        entry = self.lookup(request)
+        if self.cache.is_fresh(entry):
+            self.cache.record('hits')
+            return cached_response(request, entry)
+
+        revalidating = False
+        conditional = 'If-None-Match' in request.headers or 'If-Modified-Since' in request.headers
+        if entry is not None and not conditional:
+            etag, modified = entry['headers'].get('ETag'), entry['headers'].get('Last-Modified')
+            if etag or modified:
+                request = request.copy()
+                if etag:
+                    request.headers['If-None-Match'] = etag
+                if modified:
+                    request.headers['If-Modified-Since'] = modified
+                revalidating = True
+
+        response = super().send(request, stream=stream, **kwargs)
+        if revalidating and response.status_code == 304:
+            response.close()
+            self.cache.touch(entry['key'])
+            self.cache.record('revalidated')
+            return cached_response(request, entry)
+        self.cache.record('misses')
+        self.store(request, response, stream)
+        return response
+
+    def store(self, request, response, stream):
+        if not is_storable(response.status_code):
+            return
+        if request.method == 'HEAD':
+            body = b''
+        elif stream:
+            # Streamed bodies are the caller's (the one-byte ranged GETs of the link and image
+            # probes): only a 206 that really is one byte is read, a server ignoring Range is not
+            if response.status_code != 206 or response.headers.get('Content-Length') != '1':
+                return
+            body = response.content
+        else:
+            length = response.headers.get('Content-Length', '')
+            if length.isdigit() and int(length) > MAX_ENTRY_BYTES:
+                return
+            body = response.content
+            if len(body) > MAX_ENTRY_BYTES:
+                return
+        self.cache.put(cache_key(request.method, request.url, request.headers), request.url,
+                       response.status_code, response.headers, body)
@@ -0,0 +1,219 @@
+# results_store.py
+import os
+import json
+import time
+import sqlite3
+import logging
+import argparse
+import threading
+from report_sink import ReportSink, REPORT_FILE
+from instrumentation import span
+
+
+STORE_FILE = 'reports/results.sqlite'
+
+
+def result_fields(row):
+    """
+    Map a result dict from any suite onto (page_url, testcase, status, comments).
+    """
+    page_url = row.get('page_url') or row.get('url') or row.get('SiteURL') or ''
+    testcase = row.get('testcase') or row.get('currency') or ''
+    return page_url, testcase, row.get('status', ''), row.get('comments', '')
+
+
+class ResultsStore:
+    def __init__(self, path=STORE_FILE):
+        """
+        Append-only history of every result row, partitioned by run and suite.
+        Rows are never updated; each run gets a new run_id.
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " run_id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " started_at REAL NOT NULL,"
+            " label TEXT);"
+            "CREATE TABLE IF NOT EXISTS results ("
+            " run_id INTEGER NOT NULL REFERENCES runs(run_id),"
+            " suite TEXT NOT NULL,"
+            " sheet TEXT NOT NULL,"
+            " page_url TEXT,"
+            " testcase TEXT,"
+            " status TEXT,"
+            " comments TEXT,"
+            " data TEXT,"
+            " recorded_at REAL NOT NULL);"
+            # Suites that took part in each run, including those that had no rows to report
+            "CREATE TABLE IF NOT EXISTS run_suites ("
+            " run_id INTEGER NOT NULL REFERENCES runs(run_id),"
+            " suite TEXT NOT NULL,"
+            " PRIMARY KEY (run_id, suite));"
+            "CREATE INDEX IF NOT EXISTS results_run_suite ON results (run_id, suite);"
+            "CREATE INDEX IF NOT EXISTS results_status_run ON results (status, run_id);"
+            # Covering index for run-to-run diffs of failing items
+            "CREATE INDEX IF NOT EXISTS results_failures"
+            " ON results (status, run_id, suite, page_url, testcase, comments);"
+        )
+        self._conn.commit()
+
+    def start_run(self, label=None):
+        """
+        Register a new run and return its id.
+        """
+        with self._lock:
+            cursor = self._conn.execute("INSERT INTO runs (started_at, label) VALUES (?, ?)", (time.time(), label))
+            self._conn.commit()
+        logging.info(f"Started results run {cursor.lastrowid}")
+        return cursor.lastrowid
+
+    def append(self, run_id, suite, sheet, rows):
+        """
+        Append result dicts for one suite of a run. The suite is recorded as
+        having run even when `rows` is empty (e.g. a links check with no failures).
+        """
+        now = time.time()
+        records = [(run_id, suite, sheet, *result_fields(row), json.dumps(row, default=str), now) for row in rows]
+        with span('store.append', 'io', rows=len(records)), self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO run_suites (run_id, suite) VALUES (?, ?)", (run_id, suite))
+            if records:
+                self._conn.executemany(
+                    "INSERT INTO results (run_id, suite, sheet, page_url, testcase, status, comments, data,"
+                    " recorded_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    records
+                )
+            self._conn.commit()
+
+    def latest_run(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+        return row[0]
+
+    def recent_runs(self, count):
+        with self._lock:
+            rows = self._conn.execute("SELECT run_id FROM runs ORDER BY run_id DESC LIMIT ?", (count,)).fetchall()
+        return [row[0] for row in rows]
+
+    def runs_up_to(self, run_id, count):
+        """
+        Ids of the `count` most recent runs up to and including `run_id`.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT run_id FROM runs WHERE run_id <= ? ORDER BY run_id DESC LIMIT ?", (run_id, count)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def suites_by_run(self, run_ids):
+        """
+        {run_id: {suites that took part in that run}}
+        """
+        marks = ', '.join('?' * len(run_ids))
+        with self._lock:
+            # Runs recorded before run_suites existed are known only by their rows
+            rows = self._conn.execute(
+                f"SELECT run_id, suite FROM run_suites WHERE run_id IN ({marks})"
+                f" UNION SELECT DISTINCT run_id, suite FROM results WHERE run_id IN ({marks})",
+                list(run_ids) * 2
+            ).fetchall()
+        suites = {}
+        for run_id, suite in rows:
+            suites.setdefault(run_id, set()).add(suite)
+        return suites
+
+    def failures_by_run(self, run_ids):
+        """
+        (run_id, suite, page_url, testcase, comments) for every failing row in `run_ids`.
+        """
+        marks = ', '.join('?' * len(run_ids))
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT run_id, suite, page_url, testcase, comments FROM results"
+                f" WHERE status = 'Fail' AND run_id IN ({marks})", list(run_ids)
+            ).fetchall()
+
+    def query(self, status=None, comments_like=None, suite=None, last_runs=None):
+        """
+        Look up result rows across runs, e.g. every 404 in the last 30 runs:
+        query(status='Fail', comments_like='404%', last_runs=30).
+        Returns dicts with run_id, suite, page_url, testcase, status and comments.
+        """
+        sql = "SELECT run_id, suite, page_url, testcase, status, comments FROM results WHERE 1 = 1"
+        params = []
+        if last_runs:
+            runs = self.recent_runs(last_runs)
+            if not runs:
+                return []
+            sql += " AND run_id >= ?"
+            params.append(min(runs))
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if suite:
+            sql += " AND suite = ?"
+            params.append(suite)
+        if comments_like:
+            sql += " AND comments LIKE ?"
+            params.append(comments_like)
+        sql += " ORDER BY run_id, rowid"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        keys = ('run_id', 'suite', 'page_url', 'testcase', 'status', 'comments')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def export_excel(self, run_id=None, report_file=REPORT_FILE):
+        """
+        Write one run (the latest by default) to an Excel report.
+        """
+        run_id = run_id or self.latest_run()
+        if run_id is None:
+            print("❌ No runs in the results store")
+            return None
+        sink = ReportSink(report_file)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sheet, data FROM results WHERE run_id = ? ORDER BY rowid", (run_id,)
+            ).fetchall()
+        for sheet, data in rows:
+            sink.add_row(sheet, json.loads(data))
+        return sink.close()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or export the results history.")
+    parser.add_argument('--store', default=STORE_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+    export = commands.add_parser('export', help="Write a run to an Excel report")
+    export.add_argument('--run', type=int, help="Run id (default: latest)")
+    export.add_argument('--output', default=REPORT_FILE)
+    query = commands.add_parser('query', help="Print matching result rows")
+    query.add_argument('--status')
+    query.add_argument('--like', help="SQL LIKE pattern for the comments, e.g. '404%%'")
+    query.add_argument('--suite')
+    query.add_argument('--last', type=int, help="Only the last N runs")
+    args = parser.parse_args(argv)
+
+    store = ResultsStore(args.store)
+    try:
+        if args.command == 'export':
+            store.export_excel(args.run, args.output)
+        else:
+            for row in store.query(args.status, args.like, args.suite, args.last):
+                print(f"{row['run_id']}\t{row['suite']}\t{row['status']}\t{row['page_url']}\t{row['testcase']}\t{row['comments']}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
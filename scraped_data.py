@@ -1,59 +1,68 @@
 # scraped_data.py
 import json
-from selenium import webdriver
+import time
+import queue
+import logging
+import argparse
+import threading
+from tqdm import tqdm
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
-import os
+from driver_pool import DriverPool
+from report_sink import ReportSink, write_results
+from instrumentation import span, traced
+from work_queue import hand_off
+
+
+# Only the fields we report, so the whole ScriptData object is never serialized
+SCRIPT_DATA_SCRIPT = """
+var data = window.ScriptData;
+if (!data) { return null; }
+var config = data.config || {}, user = data.userInfo || {}, page = data.pageData || {};
+return [config.SiteUrl, config.SiteName, user.Browser, user.CountryCode, user.IP, page.CampaignId];
+"""
+SCRIPT_DATA_KEYS = ['SiteURL', 'SiteName', 'Browser', 'CountryCode', 'IP', 'CampaignID']
+DEFAULT_BATCH_WORKERS = 1
+
+
+@traced('script_data.read')
+def read_script_data(driver):
+    """
+    Read the reported ScriptData fields from the current page; None if the page has no ScriptData.
+    """
+    values = driver.execute_script(SCRIPT_DATA_SCRIPT)
+    if values is None:
+        return None
+    return {key: value if value is not None else "" for key, value in zip(SCRIPT_DATA_KEYS, values)}
 
 
 class ScrapeData:
-    def __init__(self, url):
+    def __init__(self, url, pool=None, sink=None):
         """
-        Initialize the scraper with the provided URL and set up WebDriver.
+        Initialize the scraper with the provided URL and take a WebDriver from `pool`
+        (a private single-browser pool is used when none is given).
+        Rows go to the report through `sink` when given.
         """
-        options = Options()
-        options.headless = False  # Set to True to run in headless mode
-        # self.service = Service("C:/Users/Opu/.wdm/drivers/chromedriver/win64/131.0.6778.87/chromedriver.exe")  # Update for your local driver path
-
-        # self.driver = webdriver.Chrome(service=webdriver.chrome.service.Service("C:/Users/Opu/.wdm/drivers/chromedriver/win64/131.0.6778.87/chromedriver.exe"), options=options)
-        self.driver = webdriver.Chrome(service=webdriver.chrome.service.Service(ChromeDriverManager().install()), options=options)
+        self.owns_pool = pool is None
+        self.pool = pool or DriverPool()
+        self.driver = self.pool.acquire()
         self.url = url
-        self.driver.get(self.url)
+        self.sink = sink
+        with span('script_data.navigate', url=url):
+            self.driver.get(self.url)
 
     def scrape_data(self):
         """
         Scrapes data from the ScriptData JSON object and saves it in an Excel file.
+        Returns False if it could not be read or saved.
         """
         data = []
 
         try:
-            # Execute JavaScript to get the ScriptData object
-            script_data = self.driver.execute_script("return window.ScriptData;")
+            # Execute JavaScript to get the ScriptData fields
+            row = read_script_data(self.driver)
 
-            if script_data:
+            if row:
                 print("ScriptData fetched successfully!")
-
-                # Extract required fields from the nested structure
-                site_url = script_data.get("config", {}).get("SiteUrl", "")
-                site_name = script_data.get("config", {}).get("SiteName", "")
-                browser = script_data.get("userInfo", {}).get("Browser", "")
-                country_code = script_data.get("userInfo", {}).get("CountryCode", "")
-                ip = script_data.get("userInfo", {}).get("IP", "")
-                campaign_id = script_data.get("pageData", {}).get("CampaignId", "")
-
-                # Compile the data into a dictionary
-                row = {
-                    "SiteURL": site_url,
-                    "SiteName": site_name,
-                    "Browser": browser,
-                    "CountryCode": country_code,
-                    "IP": ip,
-                    "CampaignID": campaign_id
-                }
                 data.append(row)
 
                 # Save the data to an Excel file
@@ -62,68 +71,16 @@ class ScrapeData:
                 print("No ScriptData found on the page.")
         except Exception as e:
             print(f"Error extracting ScriptData: {e}")
+            return False
+        return True
 
     def save_to_excel(self, data):
         """
-        Saves the scraped data to an Excel file, creating or updating a specific sheet.
+        Sends the scraped rows to the "Script Data" sheet of the report.
         """
         try:
-            # Ensure the 'reports' folder exists
-            os.makedirs('reports', exist_ok=True)
-            report_file = 'reports/all_the_reports.xlsx'
-
-            # Check if the file already exists
-            if os.path.exists(report_file):
-                # Load the existing workbook
-                workbook = openpyxl.load_workbook(report_file)
-
-                # Check if the "Script Data" sheet already exists
-                if "Script Data" in workbook.sheetnames:
-                    # If it exists, use that sheet
-                    sheet = workbook["Script Data"]
-                else:
-                    # If the sheet doesn't exist, create a new one
-                    sheet = workbook.create_sheet(title="Script Data")
-            else:
-                # If the file doesn't exist, create a new workbook and sheet
-                workbook = openpyxl.Workbook()
-                sheet = workbook.active
-                sheet.title = "Script Data"
-
-            # Define headers for the sheet
-            headers = ['SiteURL', 'SiteName', 'Browser', 'CountryCode', 'IP', 'CampaignID']
-            # Write headers to the first row
-            for col, header in enumerate(headers, start=1):
-                cell = sheet.cell(row=1, column=col)
-                cell.value = header
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-
-            # Write data rows
-            for row_index, row_data in enumerate(data, start=2):  # Start from row 2 to leave space for headers
-                sheet.cell(row=row_index, column=1, value=row_data.get('SiteURL', ''))
-                sheet.cell(row=row_index, column=2, value=row_data.get('SiteName', ''))
-                sheet.cell(row=row_index, column=3, value=row_data.get('Browser', ''))
-                sheet.cell(row=row_index, column=4, value=row_data.get('CountryCode', ''))
-                sheet.cell(row=row_index, column=5, value=row_data.get('IP', ''))
-                sheet.cell(row=row_index, column=6, value=row_data.get('CampaignID', ''))
-
-            # Adjust column widths
-            for col in range(1, 7):
-                column_letter = get_column_letter(col)
-                max_length = 0
-                for cell in sheet[column_letter]:
-                    try:
-                        if cell.value:
-                            max_length = max(max_length, len(str(cell.value)))
-                    except:
-                        pass
-                sheet.column_dimensions[column_letter].width = max_length + 2
-
-            # Save the workbook
-            workbook.save(report_file)
-            print(f"✅ Data saved to Excel: {report_file}")
+            report_file = write_results('Script Data', data, self.sink, suite='script_data')
+            print(f"✅ Data saved to Excel: {report_file or 'shared report'}")
 
         except Exception as e:
             print(f"❌ Error saving data to Excel: {e}")
@@ -131,14 +88,102 @@ class ScrapeData:
 
     def close(self):
         """
-        Close the WebDriver.
+        Return the WebDriver to the pool (and shut it down if the pool is private).
         """
-        self.driver.quit()
-
-
-# Entry point
-# if __name__ == "__main__":
-#     url = "https://www.alojamiento.io/"
-#     scraper = ScrapeData(url)
-#     scraper.scrape_data()
-#     scraper.close()
+        if self.driver:
+            self.pool.release(self.driver)
+            self.driver = None
+        if self.owns_pool:
+            self.pool.close_all()
+
+
+def scrape_pages(urls, pool=None, workers=DEFAULT_BATCH_WORKERS, sink=None):
+    """
+    Read ScriptData from every URL in `urls` (any iterable, consumed lazily)
+    with `workers` browsers, each reused for its whole share of the pages.
+    Rows are streamed into the "Script Data" sheet of `sink` (or a sink of its
+    own) as they arrive. Returns (pages with ScriptData, pages without, errors).
+    """
+    workers = max(1, int(workers))
+    owns_pool = pool is None
+    pool = pool or DriverPool(size=workers)
+    owns_sink = sink is None
+    sink = sink or ReportSink(keep_existing=True)
+    # Small hand-off queue, so only a few URLs are held in memory at a time
+    pending = queue.Queue(maxsize=workers * 2)
+    counts = {'found': 0, 'missing': 0, 'errors': 0}
+    lock = threading.Lock()
+    progress = tqdm(desc="Reading ScriptData", unit="page")
+
+    def count(key):
+        with lock:
+            counts[key] += 1
+        progress.update(1)
+
+    def work():
+        driver = pool.acquire()
+        try:
+            while True:
+                url = pending.get()
+                if url is None:
+                    return
+                try:
+                    with span('script_data.navigate', url=url):
+                        driver.get(url)
+                    row = read_script_data(driver)
+                except Exception as e:
+                    logging.error(f"Error reading ScriptData from {url}: {e}")
+                    count('errors')
+                    # The browser may be broken; swap it for a fresh or reset one
+                    pool.release(driver)
+                    driver = None
+                    driver = pool.acquire()
+                    continue
+                if row is None:
+                    logging.warning(f"No ScriptData found on {url}")
+                    count('missing')
+                else:
+                    sink.add_row('Script Data', row, suite='script_data')
+                    count('found')
+        finally:
+            pool.release(driver)
+
+    started = time.time()
+    threads = [threading.Thread(target=work, name=f"script-data-{i}", daemon=True) for i in range(workers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for url in urls:
+            url = url.strip()
+            if url and not hand_off(pending, url, threads):
+                raise RuntimeError("All ScriptData workers stopped")
+    finally:
+        for _ in threads:
+            hand_off(pending, None, threads)
+        for thread in threads:
+            thread.join()
+        progress.close()
+        if owns_pool:
+            pool.close_all()
+        if owns_sink:
+            sink.close()
+    pages = sum(counts.values())
+    elapsed = time.time() - started
+    rate = pages / elapsed * 60 if elapsed else 0
+    print(f"✅ Read ScriptData from {counts['found']} of {pages} pages in {elapsed:.1f}s "
+          f"({rate:.1f} pages/min, {counts['missing']} without ScriptData, {counts['errors']} errors)")
+    return counts['found'], counts['missing'], counts['errors']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read ScriptData from many pages into the report.")
+    parser.add_argument('url_file', help="Text file with one URL per line")
+    parser.add_argument('--workers', type=int, default=DEFAULT_BATCH_WORKERS,
+                        help="Browsers reading pages in parallel (default: %(default)s)")
+    args = parser.parse_args(argv)
+    with open(args.url_file, encoding='utf-8') as urls:
+        scrape_pages(urls, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
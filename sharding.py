@@ -0,0 +1,300 @@
+# sharding.py
+import os
+import re
+import sys
+import glob
+import json
+import hashlib
+import logging
+import argparse
+import threading
+from report_sink import ReportSink, SHEETS, DERIVED_SHEETS, REPORT_FILE
+from results_store import ResultsStore, STORE_FILE
+from delta_report import compute_delta, print_delta
+
+
+SHARD_DIR = 'reports/shards'
+SHARD_FILE_PATTERN = re.compile(r'^shard-(\d+)-of-(\d+)\.jsonl$')
+
+
+def item_key(item):
+    """
+    Stable sort key of a (suite, url) manifest item, the same on every machine.
+    """
+    suite, url = item
+    return hashlib.blake2b(f"{suite}\t{url}".encode('utf-8'), digest_size=8).hexdigest()
+
+
+def read_manifest(path, suites):
+    """
+    Read a manifest file: one page URL per line, optionally followed by a
+    comma-separated list of suites to run on it (all of `suites` otherwise).
+    Blank lines and lines starting with # are skipped.
+    Returns the (suite, url) items.
+    """
+    items = []
+    with open(path, encoding='utf-8') as manifest:
+        for number, line in enumerate(manifest, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            url, _, names = line.partition(' ')
+            names = [name.strip() for name in names.split(',') if name.strip()] or list(suites)
+            unknown = [name for name in names if name not in suites]
+            if unknown:
+                raise ValueError(f"{path}:{number}: unknown suite(s) {', '.join(unknown)}")
+            items += [(name, url) for name in names]
+    return items
+
+
+def select_shard(items, index, count):
+    """
+    Items of shard `index` (1-based) out of `count`. Items are ordered by
+    their hash and dealt out round-robin, so every machine given the same
+    manifest computes the same split and the shards differ by at most one item.
+    """
+    ordered = sorted(set(items), key=item_key)
+    return ordered[index - 1::count]
+
+
+def parse_shard(value):
+    """
+    argparse type for INDEX/COUNT, e.g. 3/8 for the third of eight shards.
+    """
+    match = re.fullmatch(r'(\d+)/(\d+)', value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"expected INDEX/COUNT, e.g. 3/8, got {value!r}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def shard_path(directory, index, count):
+    return os.path.join(directory, f"shard-{index}-of-{count}.jsonl")
+
+
+def outcome_record(outcome):
+    return {'name': outcome.name, 'status': outcome.status, 'error': outcome.error,
+            'duration': round(outcome.duration, 1)}
+
+
+class ShardSink:
+    def __init__(self, path):
+        """
+        Report sink for one worker process: rows are appended to the JSONL
+        shard file `path` instead of the workbook, and merged into the report
+        and the results store later by publish_shards().
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def add_row(self, sheet, row, suite=None):
+        self.add_rows(sheet, [row], suite)
+
+    def add_rows(self, sheet, rows, suite=None):
+        if sheet not in SHEETS:
+            raise KeyError(sheet)
+        rows = list(rows)
+        if sheet in DERIVED_SHEETS:
+            return
+        # Written even without rows, so the merged run knows the suite took part
+        line = json.dumps({'sheet': sheet, 'suite': suite or sheet, 'rows': rows}, default=str)
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def add_outcomes(self, outcomes):
+        """
+        Record how each suite of the shard ended, so the merge can tell a
+        finished shard from one whose process died.
+        """
+        line = json.dumps({'outcomes': outcomes})
+        with self._lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+def record_crash(path, items, error):
+    """
+    Mark the suites of a worker process that died as crashed in its shard file.
+    """
+    outcomes = [{'name': f"{suite} {url}", 'status': 'crashed', 'error': str(error), 'duration': 0.0}
+                for suite, url in items]
+    with open(path, 'a', encoding='utf-8') as handle:
+        handle.write(json.dumps({'outcomes': outcomes}) + '\n')
+
+
+def combine_parts(parts, path):
+    """
+    Concatenate the shard files written by this machine's worker processes
+    into the single shard file `path`, and remove the parts.
+    """
+    with open(path, 'w', encoding='utf-8') as combined:
+        for part in parts:
+            if not os.path.exists(part):
+                continue
+            with open(part, encoding='utf-8') as handle:
+                for line in handle:
+                    combined.write(line)
+            os.remove(part)
+    return path
+
+
+def read_shard(path):
+    """
+    (rows by (sheet, suite), suite outcomes) recorded in one shard file.
+    """
+    rows, outcomes = {}, []
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logging.warning(f"Skipping a truncated line in {path}")
+                continue
+            if 'outcomes' in entry:
+                outcomes += entry['outcomes']
+            else:
+                rows.setdefault((entry['sheet'], entry['suite']), []).extend(entry['rows'])
+    return rows, outcomes
+
+
+def recorded_outcomes(path):
+    """
+    Suite outcomes recorded in a shard file, or None if none were recorded
+    (its process died). A shard with no items records an empty list.
+    """
+    outcomes = None
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if 'outcomes' in entry:
+                outcomes = (outcomes or []) + entry['outcomes']
+    return outcomes
+
+
+def finished_shard(path):
+    """
+    True if the shard file records how its suites ended (its process did not die).
+    """
+    return os.path.exists(path) and recorded_outcomes(path) is not None
+
+
+def shard_passed(path):
+    outcomes = recorded_outcomes(path)
+    return outcomes is not None and all(outcome['status'] == 'passed' for outcome in outcomes)
+
+
+def missing_shards(paths):
+    """
+    Shard indexes that should be present, given the counts in the file names, but are not.
+    """
+    found = {}
+    for path in paths:
+        match = SHARD_FILE_PATTERN.match(os.path.basename(path))
+        if match:
+            found.setdefault(int(match.group(2)), set()).add(int(match.group(1)))
+    return sorted(f"{index}/{count}" for count, indexes in found.items()
+                  for index in range(1, count + 1) if index not in indexes)
+
+
+def shard_files(locations):
+    """
+    Shard files named directly or found in the given directories.
+    """
+    paths = []
+    for location in locations:
+        if os.path.isdir(location):
+            paths += sorted(glob.glob(os.path.join(location, 'shard-*-of-*.jsonl')))
+        else:
+            paths.append(location)
+    return paths
+
+
+def publish_shards(paths, report_file=REPORT_FILE, store=None, label='sharded'):
+    """
+    Merge shard files into one run of the results store and one report
+    (with its Delta sheet). Returns True if every suite of every shard
+    passed and no shard is missing.
+    """
+    owns_store = store is None
+    store = store or ResultsStore()
+    run_id = store.start_run(label=label)
+    sink = ReportSink(report_file=report_file, store=store, run_id=run_id)
+    outcomes = []
+    try:
+        for path in paths:
+            rows, shard_outcomes = read_shard(path)
+            for (sheet, suite), sheet_rows in rows.items():
+                sink.add_rows(sheet, sheet_rows, suite)
+            outcomes += shard_outcomes
+            logging.info(f"Merged {path}: {sum(len(r) for r in rows.values())} rows")
+        delta = compute_delta(store, run_id)
+        sink.add_rows('Delta', delta)
+        print_delta(delta)
+    finally:
+        sink.close()
+        if owns_store:
+            store.close()
+
+    missing = missing_shards(paths)
+    unfinished = [outcome for outcome in outcomes if outcome['status'] != 'passed']
+    print(f"🧩 Merged {len(paths)} shard file(s): {len(outcomes)} suites, {len(unfinished)} not passed")
+    for outcome in unfinished:
+        detail = f" ({outcome['error']})" if outcome.get('error') else ""
+        print(f"   ❌ {outcome['name']} {outcome['status']}{detail}")
+    if missing:
+        print(f"   ❌ Missing shards: {', '.join(missing)}")
+    return not missing and not unfinished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan or merge sharded runs of main.py.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    plan = commands.add_parser('plan', help="Show how a manifest is split into shards")
+    plan.add_argument('manifest')
+    plan.add_argument('--shards', type=int, required=True)
+    plan.add_argument('--list', action='store_true', help="Also list the items of every shard")
+    merge = commands.add_parser('merge', help="Merge shard files into one report and results run")
+    merge.add_argument('shards', nargs='+', help="Shard files or directories holding them")
+    merge.add_argument('--output', default=REPORT_FILE)
+    merge.add_argument('--store', default=STORE_FILE)
+    args = parser.parse_args(argv)
+
+    if args.command == 'plan':
+        from main import SUITE_NAMES
+        items = read_manifest(args.manifest, SUITE_NAMES)
+        for index in range(1, args.shards + 1):
+            shard = select_shard(items, index, args.shards)
+            print(f"shard {index}/{args.shards}: {len(shard)} items")
+            if args.list:
+                for suite, url in shard:
+                    print(f"   {suite}\t{url}")
+        return True
+
+    paths = shard_files(args.shards)
+    if not paths:
+        print("❌ No shard files found")
+        return False
+    store = ResultsStore(args.store)
+    try:
+        return publish_shards(paths, args.output, store)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
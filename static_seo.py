@@ -0,0 +1,141 @@
+# static_seo.py
+import re
+import logging
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from link_checker import build_session, DEFAULT_TIMEOUT
+from check_urls import LINKS_SCRIPT
+from upto_alt import (HEADING_TAGS, VacationRentalTester, check_h1_tag, check_html_tag_sequence,
+                      check_image_alt_attributes, write_excel_report)
+from instrumentation import traced
+
+
+LANDMARK_TAGS = {'header', 'nav', 'footer', 'aside', 'main'}
+
+# Markers of a client-rendered shell whose content only appears after JavaScript runs
+JS_SHELL_RE = re.compile(r'<noscript[^>]*>[^<]*(enable|requires?)\s+javascript|id=["\'](root|app|__next)["\']\s*>\s*</div>',
+                         re.IGNORECASE)
+
+
+class SnapshotParser(HTMLParser):
+    """
+    Build the same snapshot VacationRentalTester.take_snapshot() returns, from raw HTML.
+    Headings are positioned by document order since there is no layout.
+    """
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.headings = []
+        self.images = []
+        self.links = []
+        self._landmarks = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'base' and attrs.get('href'):
+            self.base_url = urljoin(self.base_url, attrs['href'])
+        elif tag in HEADING_TAGS:
+            self.headings.append([tag, len(self.headings)])
+        elif tag == 'img':
+            src = attrs.get('src')
+            # The first image_audit.IMAGE_FIELDS; sizes and position need a browser
+            self.images.append([urljoin(self.base_url, src) if src else '', attrs.get('alt'), attrs.get('srcset'),
+                                attrs.get('width'), attrs.get('height'), attrs.get('loading')])
+        elif tag == 'a' and attrs.get('href'):
+            where = self._landmarks[-1] if self._landmarks else 'body'
+            self.links.append((urljoin(self.base_url, attrs['href']), where))
+        if tag in LANDMARK_TAGS or (tag == 'section' and attrs.get('id')):
+            self._landmarks.append(f"#{attrs['id']}" if attrs.get('id') else tag)
+
+    def handle_endtag(self, tag):
+        if tag in LANDMARK_TAGS or tag == 'section':
+            for i in range(len(self._landmarks) - 1, -1, -1):
+                if self._landmarks[i] == tag or (tag == 'section' and self._landmarks[i].startswith('#')):
+                    del self._landmarks[i]
+                    break
+
+    def snapshot(self):
+        return {'headings': self.headings, 'images': self.images, 'base': self.base_url}
+
+
+def needs_javascript(html, snapshot):
+    """
+    True when the static HTML cannot be trusted for the SEO checks and the
+    page has to be rendered in a browser instead.
+    """
+    if not snapshot['headings'] and not snapshot['images']:
+        return True
+    has_h1 = any(tag == 'h1' for tag, _ in snapshot['headings'])
+    return not has_h1 and bool(JS_SHELL_RE.search(html))
+
+
+class StaticSeoChecker:
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT, pool=None, response_cache=None):
+        """
+        Run the H1, heading-sequence and image-alt checks on plain HTTP responses.
+        Pages that need JavaScript fall back to VacationRentalTester using `pool`.
+        """
+        self.session = session or build_session(response_cache=response_cache)
+        self.timeout = timeout
+        self.pool = pool
+
+    @traced('static.fetch')
+    def fetch_snapshot(self, url):
+        """
+        Fetch `url` and return (snapshot, links, needs_js).
+        """
+        response = self.session.get(url, timeout=self.timeout)
+        response.raise_for_status()
+        parser = SnapshotParser(response.url)
+        parser.feed(response.text)
+        parser.close()
+        snapshot = parser.snapshot()
+        return snapshot, parser.links, needs_javascript(response.text, snapshot)
+
+    def test_page(self, url):
+        """
+        Return (results, links) for one page in the same schema as the Selenium path.
+        `links` are (href, location) pairs for the link checker.
+        """
+        snapshot, links, needs_js = self.fetch_snapshot(url)
+        if needs_js:
+            logging.info(f"Static HTML incomplete, rendering in browser: {url}")
+            return self.test_page_in_browser(url)
+        results = [
+            check_h1_tag(url, snapshot),
+            check_html_tag_sequence(url, snapshot),
+            check_image_alt_attributes(url, snapshot),
+        ]
+        return results, links
+
+    @traced('static.browser_fallback')
+    def test_page_in_browser(self, url):
+        tester = VacationRentalTester(url, pool=self.pool)
+        try:
+            tester.navigate()
+            tester.test_h1_tag()
+            tester.test_html_tag_sequence()
+            tester.test_image_alt_attributes()
+            links = tester.driver.execute_script(LINKS_SCRIPT)
+            return tester.results, links
+        finally:
+            tester.close()
+
+    def close(self):
+        self.session.close()
+
+
+def run_static_tests(url, pool=None):
+    """
+    Static-HTML counterpart of upto_alt.run_tests().
+    """
+    checker = StaticSeoChecker(pool=pool)
+    try:
+        results, _ = checker.test_page(url)
+        write_excel_report(results)
+        return results
+    except Exception as e:
+        print(f"Test execution error: {e}")
+        return []
+    finally:
+        checker.close()
@@ -0,0 +1,47 @@
+# test_currency_api.py
+import json
+import pytest
+from currency_api import parse_amount, extract_prices, is_price_key
+
+
+@pytest.mark.parametrize('text, amount', [
+    ('1,234.50', 1234.5),
+    ('1.234,50', 1234.5),
+    ('€ 99', 99.0),
+    ('USD 1 234,56', 1234.56),
+    ('1,234', 1234.0),
+    ('1.234', 1234.0),
+    ('12,5', 12.5),
+    ('JPY 16240', 16240.0),
+    ('1,234,567.89', 1234567.89),
+    ('Price on request', None),
+])
+def test_parse_amount(text, amount):
+    assert parse_amount(text) == amount
+
+
+@pytest.mark.parametrize('key, expected', [
+    ('price', True), ('Price', True), ('totalPrice', True), ('nightly_price', True), ('prices', True),
+    ('priceText', True), ('priceId', False), ('PRICE_ID', False), ('priceCount', False),
+    ('priceCurrency', False), ('pricing', False), ('name', False), ('', False),
+])
+def test_is_price_key(key, expected):
+    assert is_price_key(key) is expected
+
+
+def test_extract_prices_ignores_ids_and_counts():
+    content = json.dumps({'items': [{'price': '1,234.50', 'priceId': 77, 'priceCount': 3},
+                                    {'totalPrice': 99, 'available': True, 'nightly_price': 'EUR 45,00'}],
+                          'prices': [10, 20.5]})
+    assert extract_prices(content) == [1234.5, 99.0, 45.0, 10.0, 20.5]
+
+
+def test_extract_prices_skips_booleans_and_text():
+    content = json.dumps({'price': True, 'priceText': 'on request', 'basePrice': None})
+    assert extract_prices(content) == []
+
+
+def test_extract_prices_from_html_fragment():
+    content = ("<div><span class='x'>1</span><span class=\"js-price-value\">USD 1,080.00</span>"
+               "<span class=\"big js-price-value\">USD 97.20</span></div>")
+    assert extract_prices(content) == [1080.0, 97.2]
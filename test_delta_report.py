@@ -0,0 +1,57 @@
+# test_delta_report.py
+from results_store import ResultsStore
+from report_sink import ReportSink
+from sharding import ShardSink, publish_shards
+from delta_report import compute_delta
+
+
+BROKEN_LINK = {'page_url': 'https://example.com/gone', 'testcase': 'URL Status Code', 'status': 'Fail',
+               'comments': '404 Not Found'}
+
+
+def record_run(store, rows_by_suite):
+    run_id = store.start_run(label='test')
+    sink = ReportSink(report_file=None, store=store, run_id=run_id)
+    for suite, rows in rows_by_suite.items():
+        sink.add_rows('Test', rows, suite)
+    return run_id
+
+
+def test_failure_fixed_by_a_run_without_rows_is_resolved(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    try:
+        record_run(store, {'links': [BROKEN_LINK]})
+        # The links suite only reports failures, so a clean run adds no rows
+        run_id = record_run(store, {'links': []})
+        delta = compute_delta(store, run_id)
+    finally:
+        store.close()
+    assert [(row['change'], row['suite'], row['page_url']) for row in delta] == \
+        [('Resolved', 'links', 'https://example.com/gone')]
+
+
+def test_failure_is_kept_while_the_suite_does_not_run(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    try:
+        record_run(store, {'links': [BROKEN_LINK]})
+        run_id = record_run(store, {'seo': []})
+        delta = compute_delta(store, run_id)
+    finally:
+        store.close()
+    assert delta == []
+
+
+def test_merged_shard_without_rows_resolves_failures(tmp_path):
+    store = ResultsStore(str(tmp_path / 'results.sqlite'))
+    shard = str(tmp_path / 'shard-1-of-1.jsonl')
+    try:
+        record_run(store, {'links': [BROKEN_LINK]})
+        sink = ShardSink(shard)
+        sink.add_rows('Test', [], 'links')
+        sink.add_outcomes([{'name': 'links', 'status': 'passed', 'error': None, 'duration': 1.0}])
+        sink.close()
+        assert publish_shards([shard], report_file=None, store=store)
+        delta = compute_delta(store, store.latest_run())
+    finally:
+        store.close()
+    assert [row['change'] for row in delta] == ['Resolved']
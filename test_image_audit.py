@@ -0,0 +1,54 @@
+# test_image_audit.py
+import pytest
+from image_audit import srcset_urls, image_urls, image_record, as_pixels, sizing_problem
+
+
+BASE = 'https://example.com/rooms/'
+PIXEL = 'data:image/gif;base64,R0lGODlhAQABAAAAACw='
+
+
+@pytest.mark.parametrize('srcset, expected', [
+    ('a.jpg 1x, b.jpg 2x', [BASE + 'a.jpg', BASE + 'b.jpg']),
+    ('/img/a.jpg 480w,/img/b.jpg 960w', ['https://example.com/img/a.jpg', 'https://example.com/img/b.jpg']),
+    ('a.jpg, b.jpg', [BASE + 'a.jpg', BASE + 'b.jpg']),
+    ('  a.jpg  ', [BASE + 'a.jpg']),
+    (f'{PIXEL} 1x, b.jpg 2x', [PIXEL, BASE + 'b.jpg']),
+    ('https://cdn.example/a.jpg?w=1,2 1x', ['https://cdn.example/a.jpg?w=1,2']),
+    ('a.jpg 1x,', [BASE + 'a.jpg']),
+    ('', []),
+    (None, []),
+])
+def test_srcset_urls(srcset, expected):
+    assert srcset_urls(srcset, BASE) == expected
+
+
+def test_image_urls_lists_src_first_without_repeats():
+    image = image_record([BASE + 'a.jpg', 'Room', 'a.jpg 1x, b.jpg 2x'])
+    assert image_urls(image, BASE) == [BASE + 'a.jpg', BASE + 'b.jpg']
+
+
+@pytest.mark.parametrize('value, pixels', [('640', 640), (' 640px ', 640), (320, 320), ('50%', None),
+                                           ('auto', None), (None, None)])
+def test_as_pixels(value, pixels):
+    assert as_pixels(value) == pixels
+
+
+def rendered(width, height, natural, shown):
+    return image_record(['a.jpg', '', '', width, height, None, *natural, *shown, 0])
+
+
+@pytest.mark.parametrize('image, problem', [
+    (rendered('400', '300', (400, 300), (400, 300)), None),
+    (rendered(None, '300', (400, 300), (400, 300)), "no width/height attributes, the layout shifts when it loads"),
+    (rendered('400', '400', (400, 300), (400, 300)), "declared 400x400, image is 400x300"),
+    (rendered('400', '300', (2000, 1500), (400, 300)), "2000x1500 shown at 400x300"),
+    (rendered('400', '300', (100, 75), (400, 300)), "100x75 stretched to 400x300"),
+    (rendered('400', '300', (None, None), (400, 300)), None),
+    (rendered(None, None, (400, 300), (0, 0)), None),
+])
+def test_sizing_problem(image, problem):
+    assert sizing_problem(image) == problem
+
+
+def test_sizing_problem_allows_for_device_pixel_ratio():
+    assert sizing_problem(rendered('400', '300', (800, 600), (400, 300)), pixel_ratio=2) is None
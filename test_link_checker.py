@@ -0,0 +1,107 @@
+# test_link_checker.py
+import pytest
+import check_urls
+from check_urls import UrlTester
+from link_checker import LinkChecker, normalize_url, collect_links
+
+
+@pytest.mark.parametrize('href, expected', [
+    ('HTTPS://Example.COM/Path#section', 'https://example.com/Path'),
+    ('http://example.com:80/a', 'http://example.com/a'),
+    ('https://example.com:443', 'https://example.com/'),
+    ('https://example.com:8443/a?b=1', 'https://example.com:8443/a?b=1'),
+    ('https://example.com./a', 'https://example.com/a'),
+    ('https://bücher.example/', 'https://xn--bcher-kva.example/'),
+    ('https://[::1]:8080/x', 'https://[::1]:8080/x'),
+    ('http://[2001:DB8::1]/a', 'http://[2001:db8::1]/a'),
+    ('https://[::1]:443/', 'https://[::1]/'),
+    ('mailto:someone@example.com', None),
+    ('javascript:void(0)', None),
+    ('/relative/path', None),
+    ('', None),
+    ('https://example.com:99999/', None),
+])
+def test_normalize_url(href, expected):
+    assert normalize_url(href) == expected
+
+
+def test_normalize_url_strips_tracking_only_when_asked():
+    href = 'https://example.com/p?id=1&utm_source=mail&gclid=abc&UTM_Medium=x'
+    assert normalize_url(href) == 'https://example.com/p?id=1&utm_source=mail&gclid=abc&UTM_Medium=x'
+    assert normalize_url(href, strip_tracking=True) == 'https://example.com/p?id=1'
+
+
+def test_collect_links_groups_locations_in_first_seen_order():
+    links = collect_links([('https://b.example/x#a', 'nav'), ('https://a.example', 'main'),
+                           ('https://B.example/x', 'footer'), ('https://b.example/x', 'nav'),
+                           ('tel:123', 'footer')])
+    assert list(links.items()) == [('https://b.example/x', ['nav', 'footer']), ('https://a.example/', ['main'])]
+
+
+def stub_verdicts(monkeypatch, broken=()):
+    """
+    Replace the network check with one that records every URL and fails those in `broken`.
+    """
+    checked = []
+
+    def verdict(self, href):
+        checked.append(href)
+        if href in broken:
+            return {'page_url': href, 'testcase': 'URL Status Code', 'status': 'Fail', 'comments': '404 Not Found'}
+        return None
+
+    monkeypatch.setattr(LinkChecker, 'verdict', verdict)
+    return checked
+
+
+class FakeDriver:
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script, offset, chunk_size):
+        return self.entries[offset:offset + chunk_size]
+
+
+class FakePool:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def acquire(self):
+        return self.driver
+
+    def release(self, driver):
+        pass
+
+    def close_all(self):
+        pass
+
+
+def test_check_stream_dedupes_and_keeps_first_seen_order(monkeypatch):
+    checked = stub_verdicts(monkeypatch, broken={'https://b.example/x', 'https://c.example/'})
+    entries = [('https://c.example', 'header'), ('https://a.example/', 'nav'),
+               ('https://B.example:443/x#top', 'main'), ('https://b.example/x', 'footer'),
+               ('mailto:someone@example.com', 'footer'), ('https://c.example/', 'footer')]
+    checker = LinkChecker(max_workers=2)
+    try:
+        rows = checker.check_stream(iter(entries), queue_size=1)
+    finally:
+        checker.close()
+    assert sorted(checked) == ['https://a.example/', 'https://b.example/x', 'https://c.example/']
+    assert [row['page_url'] for row in rows] == ['https://c.example/', 'https://b.example/x']
+    assert rows[0]['locations'] == ['header', 'footer']
+    assert rows[1]['locations'] == ['main', 'footer']
+    assert (checker.stats['links_found'], checker.stats['unique_links']) == (6, 3)
+
+
+def test_url_tester_strips_tracking_variants(monkeypatch):
+    checked = stub_verdicts(monkeypatch)
+    monkeypatch.setattr(check_urls, 'wait_for_page_load', lambda driver: None)
+    driver = FakeDriver([['https://a.example/p?id=1&utm_source=mail', 'main'],
+                         ['https://a.example/p?id=1&gclid=abc', 'footer'],
+                         ['https://a.example/p?id=1', 'nav']])
+    tester = UrlTester('https://a.example/', pool=FakePool(driver), strip_tracking=True)
+    tester.check_all_urls()
+    assert checked == ['https://a.example/p?id=1']
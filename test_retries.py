@@ -0,0 +1,146 @@
+# test_retries.py
+import time
+import threading
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+import pytest
+import requests
+from host_limiter import HostLimiter, retry_after_seconds, backoff_delay, BACKOFF_CAP
+from link_checker import LinkChecker, CheckStopped
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    """
+    Answers HEAD and GET requests from a list of responses (or exceptions to raise), in order.
+    """
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.requests = []
+
+    def request(self, method, url, **kwargs):
+        self.requests.append((method, kwargs.get('headers') or {}))
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def close(self):
+        pass
+
+
+class RecordingLimiter(HostLimiter):
+    # Records backoffs instead of waiting them out
+    def __init__(self):
+        super().__init__(rate=0)
+        self.delays = []
+
+    def back_off(self, url, delay):
+        self.delays.append(delay)
+
+
+def make_checker(*answers, max_retries=3, stop=None):
+    return LinkChecker(session=FakeSession(*answers), limiter=RecordingLimiter(), max_retries=max_retries,
+                       stop=stop)
+
+
+URL = 'https://example.com/page'
+
+
+def test_retries_throttled_response_after_its_retry_after():
+    checker = make_checker(FakeResponse(503, {'Retry-After': '2'}), FakeResponse(200))
+    assert checker.verdict(URL) is None
+    assert checker.limiter.delays == [2.0]
+    assert checker.stats['retries'] == 1
+
+
+def test_long_retry_after_is_not_waited_for():
+    checker = make_checker(FakeResponse(429, {'Retry-After': '120'}))
+    row = checker.verdict(URL)
+    assert row['comments'] == '429, Retry-After 120s exceeds the 60s limit'
+    assert checker.limiter.delays == [] and len(checker.session.requests) == 1
+
+
+def test_long_retry_after_on_the_last_attempt_is_reported():
+    checker = make_checker(FakeResponse(503), FakeResponse(503, {'Retry-After': '300'}), max_retries=1)
+    assert checker.verdict(URL)['comments'] == '503, Retry-After 300s exceeds the 60s limit'
+
+
+def test_still_throttled_after_all_retries():
+    checker = make_checker(*[FakeResponse(503)] * 3, max_retries=2)
+    assert checker.verdict(URL)['comments'] == '503 after 2 retries'
+    assert len(checker.session.requests) == 3
+    assert len(checker.limiter.delays) == 2 and all(0 <= delay <= BACKOFF_CAP for delay in checker.limiter.delays)
+
+
+def test_connection_errors_are_retried():
+    checker = make_checker(requests.ConnectionError('reset'), FakeResponse(404), max_retries=1)
+    assert checker.verdict(URL)['comments'] == '404 Not Found'
+    assert checker.stats['retries'] == 1
+
+
+def test_connection_error_on_the_last_attempt_fails_the_link():
+    checker = make_checker(requests.Timeout('slow'), requests.Timeout('slow'), max_retries=1)
+    assert checker.verdict(URL)['comments'] == 'Error: slow'
+
+
+def test_rejected_head_falls_back_to_a_ranged_get():
+    checker = make_checker(FakeResponse(405), FakeResponse(206))
+    assert checker.verdict(URL) is None
+    assert [method for method, _ in checker.session.requests] == ['HEAD', 'GET']
+    assert checker.session.requests[1][1]['Range'] == 'bytes=0-0'
+
+
+def test_stopped_checker_sends_no_requests():
+    stop = threading.Event()
+    stop.set()
+    checker = make_checker(FakeResponse(200), stop=stop)
+    with pytest.raises(CheckStopped):
+        checker.verdict(URL)
+    assert checker.session.requests == []
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds('5') == 5.0
+    assert retry_after_seconds(' 120 ') == 120.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds('') is None
+    assert retry_after_seconds('soon') is None
+    assert retry_after_seconds('-1') is None
+
+
+def test_retry_after_seconds_from_http_date():
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=30), usegmt=True)
+    earlier = format_datetime(datetime.now(timezone.utc) - timedelta(seconds=30), usegmt=True)
+    assert 28 <= retry_after_seconds(later) <= 30
+    assert retry_after_seconds(earlier) == 0.0
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt) <= min(BACKOFF_CAP, 0.5 * 2 ** attempt) for attempt in range(10))
+
+
+def test_back_off_holds_the_host_only():
+    limiter = HostLimiter(rate=0)
+    limiter.back_off(URL, 0.2)
+    started = time.monotonic()
+    with limiter.slot('https://other.example/'):
+        pass
+    assert time.monotonic() - started < 0.1
+    with limiter.slot(URL):
+        pass
+    assert time.monotonic() - started >= 0.15
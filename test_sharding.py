@@ -0,0 +1,82 @@
+# test_sharding.py
+import argparse
+import pytest
+from sharding import (ShardSink, read_manifest, select_shard, parse_shard, record_crash, finished_shard,
+                      shard_passed, missing_shards)
+
+
+SUITES = ['seo', 'links', 'currency']
+ITEMS = [(suite, f"https://example.com/{page}") for suite in SUITES for page in range(7)]
+
+
+@pytest.mark.parametrize('count', [1, 2, 3, 8, 30])
+def test_select_shard_splits_every_item_once(count):
+    shards = [select_shard(ITEMS, index, count) for index in range(1, count + 1)]
+    assert sorted(item for shard in shards for item in shard) == sorted(ITEMS)
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+
+
+def test_select_shard_ignores_input_order_and_duplicates():
+    assert select_shard(list(reversed(ITEMS)) + ITEMS[:3], 2, 4) == select_shard(ITEMS, 2, 4)
+
+
+def test_select_shard_beyond_the_items_is_empty():
+    assert select_shard(ITEMS[:5], 6, 8) == []
+
+
+@pytest.mark.parametrize('value, expected', [('3/8', (3, 8)), (' 1/1 ', (1, 1)), ('8/8', (8, 8))])
+def test_parse_shard(value, expected):
+    assert parse_shard(value) == expected
+
+
+@pytest.mark.parametrize('value', ['0/4', '5/4', '3', '3/8/1', 'a/b', ''])
+def test_parse_shard_rejects(value):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_shard(value)
+
+
+def test_read_manifest(tmp_path):
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text("# pages\nhttps://a.example/\n\nhttps://b.example/ links, seo\n", encoding='utf-8')
+    assert read_manifest(manifest, SUITES) == [('seo', 'https://a.example/'), ('links', 'https://a.example/'),
+                                               ('currency', 'https://a.example/'), ('links', 'https://b.example/'),
+                                               ('seo', 'https://b.example/')]
+
+
+def test_read_manifest_rejects_unknown_suites(tmp_path):
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text("https://a.example/ links,typo\n", encoding='utf-8')
+    with pytest.raises(ValueError, match=':1: unknown suite'):
+        read_manifest(manifest, SUITES)
+
+
+def write_shard(path, outcomes):
+    sink = ShardSink(str(path))
+    sink.add_rows('Test', [{'page_url': 'https://a.example/', 'status': 'Pass'}], 'links')
+    if outcomes is not None:
+        sink.add_outcomes(outcomes)
+    sink.close()
+    return str(path)
+
+
+def test_empty_shard_counts_as_passed(tmp_path):
+    path = write_shard(tmp_path / 'shard-6-of-8.jsonl', [])
+    assert finished_shard(path) and shard_passed(path)
+
+
+def test_shard_without_outcomes_did_not_finish(tmp_path):
+    path = write_shard(tmp_path / 'shard-1-of-2.jsonl', None)
+    assert not finished_shard(path) and not shard_passed(path)
+    record_crash(path, [('links', 'https://a.example/')], 'worker exited with code -9')
+    assert finished_shard(path) and not shard_passed(path)
+
+
+def test_shard_passes_only_if_every_suite_passed(tmp_path):
+    passed = {'name': 'links', 'status': 'passed', 'error': None, 'duration': 1.0}
+    failed = dict(passed, name='seo', status='failed')
+    assert shard_passed(write_shard(tmp_path / 'shard-1-of-2.jsonl', [passed]))
+    assert not shard_passed(write_shard(tmp_path / 'shard-2-of-2.jsonl', [passed, failed]))
+
+
+def test_missing_shards():
+    assert missing_shards(['d/shard-1-of-3.jsonl', 'd/shard-3-of-3.jsonl', 'd/other.jsonl']) == ['2/3']
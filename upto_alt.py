@@ -1,64 +1,141 @@
 # upto_alt.py
-import os
 import json
-import time
 import logging
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
-from openpyxl.utils import get_column_letter
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from driver_pool import DriverPool
+from report_sink import write_results
+from waits import wait_for_page_load
+from instrumentation import traced
+from image_audit import ImageProber, audit_page_images, DEFAULT_MAX_IMAGE_KB
+from link_checker import CheckStopped
+
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+
+# Returns compact JSON: headings as [tag, y] in document order, images as [src, alt, ...]
+# in image_audit.IMAGE_FIELDS order, plus the base URL and [viewport height, device pixel ratio]
+SNAPSHOT_SCRIPT = """
+var headings = Array.from(document.querySelectorAll('h1, h2, h3, h4, h5, h6'), function (h) {
+    return [h.tagName.toLowerCase(), Math.round(h.getBoundingClientRect().top + window.scrollY)];
+});
+var images = Array.from(document.images, function (img) {
+    var box = img.getBoundingClientRect();
+    return [img.src, img.getAttribute('alt'), img.getAttribute('srcset'), img.getAttribute('width'),
+            img.getAttribute('height'), img.getAttribute('loading'), img.naturalWidth, img.naturalHeight,
+            Math.round(box.width), Math.round(box.height), Math.round(box.top + window.scrollY)];
+});
+return JSON.stringify({headings: headings, images: images, base: document.baseURI,
+                       viewport: [window.innerHeight, window.devicePixelRatio || 1]});
+"""
+
+
+def check_h1_tag(url, snapshot):
+    """
+    H1 tag existence, evaluated on a page snapshot
+    """
+    status = any(tag == 'h1' for tag, _ in snapshot['headings'])
+    return {
+        'page_url': url,
+        'testcase': 'H1 Tag Existence',
+        'status': 'Pass' if status else 'Fail',
+        'comments': 'H1 tag found' if status else 'No H1 tag present'
+    }
+
+
+def check_html_tag_sequence(url, snapshot):
+    """
+    Heading order (H1->H2->...->H6), evaluated on a page snapshot
+    """
+    # Sort tags by their position (y-coordinate); ties keep heading level, then document order
+    found_tags = sorted(snapshot['headings'], key=lambda x: (x[1], HEADING_TAGS.index(x[0])))
+    found_tag_names = [tag for tag, _ in found_tags]
+
+    # Validate sequence
+    valid_sequence = True
+    for i in range(1, len(found_tag_names)):
+        if HEADING_TAGS.index(found_tag_names[i - 1]) > HEADING_TAGS.index(found_tag_names[i]):
+            valid_sequence = False
+            break
+
+    return {
+        'page_url': url,
+        'testcase': 'HTML Tag Sequence',
+        'status': 'Pass' if valid_sequence else 'Fail',
+        'comments': f'Found tags in order: {found_tag_names}' if valid_sequence else f'Invalid sequence: {found_tag_names}'
+    }
+
+
+def check_image_alt_attributes(url, snapshot):
+    """
+    Image alt attributes, evaluated on a page snapshot
+    """
+    failed_images = [src for src, alt, *_ in snapshot['images'] if not alt]
+    status = len(failed_images) == 0
+    return {
+        'page_url': url,
+        'testcase': 'Image Alt Attributes',
+        'status': 'Pass' if status else 'Fail',
+        'comments': 'All images have alt attributes' if status else f'Missing alt for: {failed_images}'
+    }
 
 
 class VacationRentalTester:
-    def __init__(self, url):
+    def __init__(self, url, pool=None, sink=None):
         """
-        Initialize the tester with Chrome WebDriver
+        Initialize the tester with a Chrome WebDriver taken from `pool`
+        (a private single-browser pool is used when none is given).
+        Results go to the report through `sink` when given.
         """
         try:
-            options = Options()
-            options.headless = False
-            # Setup Chrome WebDriver
-            self.service = Service(ChromeDriverManager().install())
-            # self.service = Service("C:/Users/Opu/.wdm/drivers/chromedriver/win64/131.0.6778.87/chromedriver.exe")  # For home
-            self.driver = webdriver.Chrome(service=self.service)
+            self.owns_pool = pool is None
+            self.pool = pool or DriverPool()
+            self.driver = self.pool.acquire()
             self.url = url
             self.results = []
+            self.sink = sink
+            self.snapshot = None
             logging.info(f"Initialized tester for URL: {url}")
         except Exception as e:
             logging.error(f"Initialization error: {e}")
             raise
 
+    @traced('seo.navigate')
     def navigate(self):
         """
         Navigate to the website
         """
         try:
             self.driver.get(self.url)
-            time.sleep(3)  # Wait for page load
+            wait_for_page_load(self.driver)  # Wait for page load
+            self.snapshot = None
             logging.info(f"Successfully navigated to {self.url}")
         except Exception as e:
             logging.error(f"Navigation error: {e}")
             raise
 
+    @traced('seo.snapshot')
+    def take_snapshot(self):
+        """
+        Read every heading (tag and position) and every image (src and alt) in
+        a single script call; all SEO checks then run from this snapshot.
+        """
+        self.snapshot = json.loads(self.driver.execute_script(SNAPSHOT_SCRIPT))
+        logging.info(f"Snapshot: {len(self.snapshot['headings'])} headings, {len(self.snapshot['images'])} images")
+        return self.snapshot
+
+    def get_snapshot(self):
+        if self.snapshot is None:
+            self.take_snapshot()
+        return self.snapshot
+
+    @traced('seo.test_h1_tag')
     def test_h1_tag(self):
         """
         Test H1 tag existence
         """
         try:
-            h1_tags = self.driver.find_elements(By.TAG_NAME, 'h1')
-            status = len(h1_tags) > 0
-            self.results.append({
-                'page_url': self.url,
-                'testcase': 'H1 Tag Existence',
-                'status': 'Pass' if status else 'Fail',
-                'comments': 'H1 tag found' if status else 'No H1 tag present'
-            })
+            self.results.append(check_h1_tag(self.url, self.get_snapshot()))
         except Exception as e:
             self.results.append({
                 'page_url': self.url,
@@ -67,38 +144,13 @@ class VacationRentalTester:
                 'comments': f'Error checking H1: {str(e)}'
             })
 
+    @traced('seo.test_html_tag_sequence')
     def test_html_tag_sequence(self):
         """
         Test HTML heading tag sequence to ensure they follow a proper order (H1->H2->...->H6).
         """
         try:
-            heading_tags = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
-            found_tags = []
-            
-            # Collect heading tags with their positions
-            for tag in heading_tags:
-                elements = self.driver.find_elements(By.TAG_NAME, tag)
-                for elem in elements:
-                    found_tags.append((tag, elem.location['y']))
-            
-            # Sort tags by their position
-            found_tags.sort(key=lambda x: x[1])  # Sort by position (y-coordinate)
-            found_tag_names = [tag for tag, _ in found_tags]
-
-            # Validate sequence
-            valid_sequence = True
-            for i in range(1, len(found_tag_names)):
-                if heading_tags.index(found_tag_names[i - 1]) > heading_tags.index(found_tag_names[i]):
-                    valid_sequence = False
-                    break
-
-            # Record results
-            self.results.append({
-                'page_url': self.url,
-                'testcase': 'HTML Tag Sequence',
-                'status': 'Pass' if valid_sequence else 'Fail',
-                'comments': f'Found tags in order: {found_tag_names}' if valid_sequence else f'Invalid sequence: {found_tag_names}'
-            })
+            self.results.append(check_html_tag_sequence(self.url, self.get_snapshot()))
         except Exception as e:
             self.results.append({
                 'page_url': self.url,
@@ -107,21 +159,13 @@ class VacationRentalTester:
                 'comments': f'Error checking tag sequence: {str(e)}'
             })
 
+    @traced('seo.test_image_alt_attributes')
     def test_image_alt_attributes(self):
         """
         Test image alt attributes
         """
         try:
-            images = self.driver.find_elements(By.TAG_NAME, 'img')
-            failed_images = [img.get_attribute('src') for img in images if not img.get_attribute('alt')]
-            
-            status = len(failed_images) == 0
-            self.results.append({
-                'page_url': self.url,
-                'testcase': 'Image Alt Attributes',
-                'status': 'Pass' if status else 'Fail',
-                'comments': 'All images have alt attributes' if status else f'Missing alt for: {failed_images}'
-            })
+            self.results.append(check_image_alt_attributes(self.url, self.get_snapshot()))
         except Exception as e:
             self.results.append({
                 'page_url': self.url,
@@ -130,79 +174,69 @@ class VacationRentalTester:
                 'comments': f'Error checking image alt attributes: {str(e)}'
             })
 
-
-    def generate_excel_report(self):
+    @traced('seo.test_image_assets')
+    def test_image_assets(self, prober=None, max_bytes=DEFAULT_MAX_IMAGE_KB * 1024):
         """
-        Generate or overwrite Excel report of test results with formatting
+        Audit every image: broken src/srcset URLs, files over `max_bytes`,
+        images sized differently from how they are shown and below-the-fold
+        images without lazy loading. Image URLs are probed concurrently with
+        `prober` (an ImageProber; a private one when not given). Natural sizes
+        are only known if the browser was allowed to load images.
         """
+        owns_prober = prober is None
+        prober = prober or ImageProber()
         try:
-            # Create reports directory if it doesn't exist
-            os.makedirs('reports', exist_ok=True)
-
-            # Define the report file path
-            report_file = 'reports/all_the_reports.xlsx'
-
-            # Check if the file already exists
-            if os.path.exists(report_file):
-                # print("Exist...")
-                workbook = openpyxl.Workbook()
-                sheet = workbook.active
-                if "Test" not in workbook.sheetnames:
-                    sheet = workbook.create_sheet(title="Test")
-                else:
-                    sheet = workbook["Test"]
-            else:
-                workbook = openpyxl.Workbook()
-                sheet = workbook.active
-                sheet = workbook.create_sheet(title="Test")
-
-            # Define headers
-            headers = ['Page URL', 'Test Case', 'Status', 'Comments']
-
-            # Write headers with formatting
-            for col, header in enumerate(headers, 1):
-                cell = sheet.cell(row=1, column=col)
-                cell.value = header
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color="DDDDDD", end_color="DDDDDD", fill_type="solid")
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-
-            # Write test results
-            for row, result in enumerate(self.results, start=2):
-                sheet.cell(row=row, column=1, value=result.get('page_url', ''))
-                sheet.cell(row=row, column=2, value=result.get('testcase', ''))
-                sheet.cell(row=row, column=3, value=result.get('status', ''))
-                sheet.cell(row=row, column=4, value=result.get('comments', ''))
-
-            # Auto-adjust column widths
-            for col in range(1, 5):
-                column_letter = get_column_letter(col)
-                sheet.column_dimensions[column_letter].auto_size = True
-
-            # Save the workbook
-            workbook.save(report_file)
-            logging.info(f"Excel report generated successfully: {report_file}")
-            print(f"✅ Excel Report generated: {report_file}")
-
-            return report_file
-
+            self.results.extend(audit_page_images(self.url, self.get_snapshot(), prober, max_bytes))
+        except CheckStopped:
+            raise
         except Exception as e:
-            logging.error(f"Excel report generation error: {e}")
-            print(f"❌ Error generating Excel report: {e}")
-            return None
+            self.results.append({
+                'page_url': self.url,
+                'testcase': 'Image Assets',
+                'status': 'Fail',
+                'comments': f'Error auditing images: {str(e)}'
+            })
+        finally:
+            if owns_prober:
+                prober.close()
+
+    def generate_excel_report(self, suite='seo'):
+        """
+        Send test results to the report (the shared sink if one was given)
+        """
+        return write_excel_report(self.results, self.sink, suite)
 
     def close(self):
         """
-        Close browser
+        Return the browser to the pool (and shut it down if the pool is private)
         """
         if self.driver:
-            self.driver.quit()
+            self.pool.release(self.driver)
+            self.driver = None
+        if self.owns_pool:
+            self.pool.close_all()
 
 
-def run_tests(url):
+def write_excel_report(results, sink=None, suite='seo'):
+    """
+    Send test results to the Test sheet of the shared report
+    """
+    try:
+        return write_results('Test', results, sink, suite=suite)
+    except Exception as e:
+        logging.error(f"Excel report generation error: {e}")
+        print(f"❌ Error generating Excel report: {e}")
+        return None
+
+
+def run_tests(url, pool=None, sink=None):
+    """
+    SEO checks of one page, reported as the 'seo' suite. Returns False if
+    the run was cut short.
+    """
     tester = None
     try:
-        tester = VacationRentalTester(url)
+        tester = VacationRentalTester(url, pool=pool, sink=sink)
         tester.navigate()
         tester.test_h1_tag()
         tester.test_html_tag_sequence()
@@ -213,12 +247,39 @@ def run_tests(url):
 
     except Exception as e:
         print(f"Test execution error: {e}")
+        return False
+
+    finally:
+        if tester:
+            tester.close()
+    return True
+
+
+def run_image_audit(url, pool=None, sink=None, max_bytes=DEFAULT_MAX_IMAGE_KB * 1024, response_cache=None,
+                    limiter=None, stop=None):
+    """
+    Image-asset audit of one page, reported as the 'images' suite. The pool's
+    browsers should load images (browser_profile.IMAGE_PROFILE) so natural
+    sizes are known. Image probes share `limiter` (a HostLimiter) with the
+    link checks and end once the `stop` event is set. Returns False if the
+    run was cut short.
+    """
+    tester = None
+    prober = ImageProber(response_cache=response_cache, limiter=limiter, stop=stop)
+    try:
+        tester = VacationRentalTester(url, pool=pool, sink=sink)
+        tester.navigate()
+        tester.test_image_assets(prober, max_bytes)
+        tester.generate_excel_report(suite='images')
+    except Exception as e:
+        print(f"Test execution error: {e}")
+        return False
+    finally:
+        prober.close()
+        if tester:
+            tester.close()
+    return True
 
-    # finally:
-    #     if tester:
-    #         tester.close()
-            
-   
 
 # Example usage
 # if __name__ == "__main__":
@@ -0,0 +1,129 @@
+# waits.py
+import time
+import logging
+from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+from selenium.webdriver.support.ui import WebDriverWait
+from instrumentation import traced
+
+
+DEFAULT_WAIT_TIMEOUT = 15
+DEFAULT_IDLE_TIME = 0.5
+POLL_FREQUENCY = 0.1
+
+# Number of network requests the page has started plus those still in flight
+# (fetch/XHR are counted by a small hook installed on first use).
+NETWORK_STATE_SCRIPT = """
+if (!window.__qaPending) {
+    window.__qaPending = {count: 0};
+    var pending = window.__qaPending;
+    var originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function () {
+            pending.count++;
+            return originalFetch.apply(this, arguments).finally(function () { pending.count--; });
+        };
+    }
+    var originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        pending.count++;
+        this.addEventListener('loadend', function () { pending.count--; });
+        return originalSend.apply(this, arguments);
+    };
+}
+return [performance.getEntriesByType('resource').length, window.__qaPending.count];
+"""
+
+
+class page_is_ready:
+    """
+    Expected condition: document.readyState is 'complete'.
+    """
+    def __call__(self, driver):
+        return driver.execute_script("return document.readyState") == 'complete'
+
+
+class network_is_idle:
+    """
+    Expected condition: no new resource has started and no fetch/XHR has been
+    pending for `idle_time` seconds.
+    """
+    def __init__(self, idle_time=DEFAULT_IDLE_TIME):
+        self.idle_time = idle_time
+        self.last_state = None
+        self.quiet_since = None
+
+    def __call__(self, driver):
+        state = driver.execute_script(NETWORK_STATE_SCRIPT)
+        now = time.monotonic()
+        if state != self.last_state or state[1] > 0:
+            self.last_state = state
+            self.quiet_since = now
+            return False
+        return now - self.quiet_since >= self.idle_time
+
+
+class text_changed:
+    """
+    Expected condition: every element matching `locator` has text different
+    from `initial_texts`. Returns the new texts. `transform` is applied to each
+    text before comparing (e.g. to ignore a currency prefix).
+    """
+    def __init__(self, locator, initial_texts, transform=None):
+        self.locator = locator
+        self.initial_texts = list(initial_texts)
+        self.transform = transform or (lambda text: text)
+
+    def read(self, driver):
+        return [self.transform(elem.text.strip()) for elem in driver.find_elements(*self.locator)]
+
+    def __call__(self, driver):
+        try:
+            texts = self.read(driver)
+        except StaleElementReferenceException:
+            return False
+        if len(texts) != len(self.initial_texts):
+            return texts
+        if texts and all(new != old for new, old in zip(texts, self.initial_texts)):
+            return texts
+        return False
+
+
+def wait_for_page_ready(driver, timeout=DEFAULT_WAIT_TIMEOUT):
+    WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(page_is_ready())
+
+
+def wait_for_network_idle(driver, idle_time=DEFAULT_IDLE_TIME, timeout=DEFAULT_WAIT_TIMEOUT):
+    """
+    Wait until the page is quiet; a page that never settles is logged, not fatal.
+    """
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(network_is_idle(idle_time))
+    except TimeoutException:
+        logging.warning(f"Network still busy after {timeout}s, continuing")
+
+
+@traced('wait.page_load')
+def wait_for_page_load(driver, timeout=DEFAULT_WAIT_TIMEOUT):
+    """
+    Wait for document ready and then for network idle.
+    """
+    wait_for_page_ready(driver, timeout)
+    wait_for_network_idle(driver, timeout=timeout)
+
+
+@traced('wait.text_change')
+def wait_for_text_change(driver, locator, initial_texts, timeout=DEFAULT_WAIT_TIMEOUT, transform=None):
+    """
+    Wait until the text of the elements at `locator` changes and return the new
+    texts. On timeout the current texts are returned so the caller can decide.
+    """
+    condition = text_changed(locator, initial_texts, transform)
+    if not condition.initial_texts:
+        # Nothing to compare against; waiting could only end in a timeout
+        return condition.read(driver)
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY,
+                             ignored_exceptions=[StaleElementReferenceException]).until(condition)
+    except TimeoutException:
+        logging.warning(f"Text at {locator} did not change within {timeout}s")
+        return condition.read(driver)
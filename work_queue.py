@@ -0,0 +1,17 @@
+# work_queue.py
+import queue
+
+
+def hand_off(work, item, workers, poll_interval=1.0):
+    """
+    Put `item` on the bounded queue `work`, waiting while it is full.
+    Returns False instead if every thread in `workers` has died, so a
+    producer never blocks forever on a queue nobody reads.
+    """
+    while True:
+        try:
+            work.put(item, timeout=poll_interval)
+            return True
+        except queue.Full:
+            if not any(worker.is_alive() for worker in workers):
+                return False